@@ -1,4 +1,4 @@
 # Email Expert Module
-from .agent import EmailExpertAgent
+from .agent import EmailExpertAgent, get_agent
 
-__all__ = ["EmailExpertAgent"]
+__all__ = ["EmailExpertAgent", "get_agent"]
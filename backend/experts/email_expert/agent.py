@@ -2,20 +2,30 @@
 Email Expert LangGraph Agent
 LangGraph-based agent for generating professional emails with multi-step workflow.
 """
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Dict, Any, Optional, TypedDict, Tuple
+import threading
+from typing import AsyncIterator, Dict, Any, List, Optional, TypedDict, Tuple
 from langgraph.graph import StateGraph, END
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
 
 from .config import (
-    GEMINI_API_KEY, GEMINI_MODEL, MAX_TOKENS, TEMPERATURE,
-    USE_EVALUATOR, EVALUATOR_THRESHOLD, EVALUATOR_MAX_RETRIES, EVALUATOR_MODEL,
+    GEMINI_API_KEY, GEMINI_MODEL, DRAFT_MODEL, MAX_TOKENS, TEMPERATURE,
+    USE_EVALUATOR, USE_PLANNER, USE_SPECULATIVE_DRAFTING, EVALUATOR_THRESHOLD, EVALUATOR_MAX_RETRIES, EVALUATOR_MODEL,
     MAX_TOKENS_RETRY_MULTIPLIER, TEMPERATURE_INCREMENT_PER_ATTEMPT, MAX_TEMPERATURE,
     MAX_TOKENS_RETRY_MAX_ATTEMPTS, MIN_EMAIL_LENGTH, MIN_BODY_LENGTH,
-    EVALUATOR_MAX_CRITICAL_ERRORS_DISPLAY
+    EVALUATOR_MAX_CRITICAL_ERRORS_DISPLAY, EVALUATOR_DEFAULT_SCORE, EMAIL_MAX_CONCURRENCY,
+    EMAIL_CACHE_SIZE, EMAIL_CACHE_TTL, EMAIL_CACHE_MAX_TEMPERATURE
+)
+from .prompts import (
+    EMAIL_SYSTEM_PROMPT, EMAIL_USER_PROMPT_TEMPLATE, EMAIL_REVISION_PROMPT_TEMPLATE,
+    EMAIL_PLAN_SYSTEM_PROMPT, EMAIL_PLAN_PROMPT_TEMPLATE
 )
-from .prompts import EMAIL_SYSTEM_PROMPT, EMAIL_USER_PROMPT_TEMPLATE
 from .tools import (
     ContextExtractor,
     TemplateGenerator,
@@ -25,6 +35,33 @@ from .tools import (
 
 logger = logging.getLogger(__name__)
 
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
+
+
+class EmailPlanEntities(BaseModel):
+    """Key entities the planner pulls out of the request."""
+    dates: List[str] = Field(default_factory=list)
+    recipient: Optional[str] = None
+    sender: Optional[str] = None
+    reason: Optional[str] = None
+    duration: Optional[str] = None
+    deadline: Optional[str] = None
+
+
+class EmailPlan(BaseModel):
+    """Structured planner output covering the context, template and tone steps."""
+    extracted_context: str = Field(description="Summary of the full context, purpose and requirements")
+    intent: str = Field(description="Primary intent, e.g. sick_leave, vacation, meeting")
+    email_type: str = Field(description="Type of email, e.g. sick_leave, vacation, general")
+    key_entities: EmailPlanEntities
+    urgency: str = Field(description="urgent/normal/low")
+    formality_level: str = Field(description="formal/semi-formal/casual/professional")
+    email_template: str = Field(description="Complete email template with Subject, Greeting, Body and Closing")
+    tone_adjusted_email: str = Field(description="The template rewritten in the required tone")
+
 
 class EmailAgentState(TypedDict):
     """State schema for LangGraph email agent."""
@@ -68,13 +105,72 @@ class EmailExpertAgent:
                     temperature=TEMPERATURE,
                     max_output_tokens=MAX_TOKENS
                 )
+                # Higher-limit client for MAX_TOKENS retries, built once so a
+                # retry reuses its connection and auth instead of opening new ones
+                self.llm_retry = ChatGoogleGenerativeAI(
+                    model=GEMINI_MODEL,
+                    google_api_key=GEMINI_API_KEY,
+                    temperature=TEMPERATURE,
+                    max_output_tokens=int(MAX_TOKENS * MAX_TOKENS_RETRY_MULTIPLIER)
+                )
                 logger.info(f"LLM initialized: {GEMINI_MODEL}")
             except Exception as e:
                 logger.error(f"LLM initialization failed: {e}")
                 self.llm = None
+                self.llm_retry = None
         else:
             logger.warning("No GEMINI_API_KEY. LLM disabled.")
             self.llm = None
+            self.llm_retry = None
+        
+        # Optional fast draft model for the first attempt. The evaluator is the
+        # verifier: a passing draft is accepted, a failing one is revised by
+        # self.llm, so drafting needs the evaluator and at least one retry
+        self.draft_llm = None
+        if USE_SPECULATIVE_DRAFTING and self.llm:
+            if not USE_EVALUATOR or EVALUATOR_MAX_RETRIES < 1:
+                logger.warning("Speculative drafting needs the evaluator and EVALUATOR_MAX_RETRIES >= 1; drafting disabled")
+            else:
+                try:
+                    self.draft_llm = ChatGoogleGenerativeAI(
+                        model=DRAFT_MODEL,
+                        google_api_key=GEMINI_API_KEY,
+                        temperature=TEMPERATURE,
+                        max_output_tokens=MAX_TOKENS
+                    )
+                    logger.info(f"Draft LLM initialized: {DRAFT_MODEL}")
+                except Exception as e:
+                    logger.error(f"Draft LLM initialization failed: {e}")
+        
+        # Optional single-call planner replacing the context/template/tone tools
+        self.planner = None
+        if USE_PLANNER and self.llm:
+            try:
+                self.planner = self.llm.with_structured_output(EmailPlan)
+                logger.info("Email planner enabled")
+            except Exception as e:
+                logger.error(f"Planner initialization failed, using step-by-step tools: {e}")
+        
+        # The system prompt never changes, so build its message once
+        self._system_message = SystemMessage(content=EMAIL_SYSTEM_PROMPT)
+        
+        # Bounds concurrent agenerate() workflows; created on first use so it
+        # binds to the serving event loop rather than whichever loop exists at import
+        self._generate_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # TTL cache of finished emails so repeated requests skip the workflow. The
+        # LLMs sample at the configured TEMPERATURE whatever a request asks for,
+        # so the cache is only enabled when that is low enough to be near-deterministic
+        self._response_cache = (
+            TTLCache(maxsize=EMAIL_CACHE_SIZE, ttl=EMAIL_CACHE_TTL)
+            if TTLCache is not None and EMAIL_CACHE_SIZE > 0 and TEMPERATURE <= EMAIL_CACHE_MAX_TEMPERATURE
+            else None
+        )
+        self._response_cache_lock = threading.Lock()
+        if TTLCache is None:
+            logger.debug("cachetools not installed - email response cache disabled")
+        elif TEMPERATURE > EMAIL_CACHE_MAX_TEMPERATURE:
+            logger.debug(f"EMAIL_TEMPERATURE {TEMPERATURE} > {EMAIL_CACHE_MAX_TEMPERATURE} - email response cache disabled")
         
         # Build LangGraph workflow
         self.workflow = self._build_workflow()
@@ -85,18 +181,24 @@ class EmailExpertAgent:
         workflow = StateGraph(EmailAgentState)
         
         # Add nodes
-        workflow.add_node("extract_context", self._extract_context_node)
-        workflow.add_node("generate_template", self._generate_template_node)
-        workflow.add_node("transform_tone", self._transform_tone_node)
         workflow.add_node("generate_email", self._generate_email_node)
         workflow.add_node("evaluate_email", self._evaluate_email_node)
         workflow.add_node("regenerate_if_needed", self._regenerate_if_needed_node)
         
         # Define workflow edges
-        workflow.set_entry_point("extract_context")
-        workflow.add_edge("extract_context", "generate_template")
-        workflow.add_edge("generate_template", "transform_tone")
-        workflow.add_edge("transform_tone", "generate_email")
+        if self.planner:
+            # One structured call fills context, template and tone-adjusted content
+            workflow.add_node("plan", self._plan_node)
+            workflow.set_entry_point("plan")
+            workflow.add_edge("plan", "generate_email")
+        else:
+            workflow.add_node("extract_context", self._extract_context_node)
+            workflow.add_node("generate_template", self._generate_template_node)
+            workflow.add_node("transform_tone", self._transform_tone_node)
+            workflow.set_entry_point("extract_context")
+            workflow.add_edge("extract_context", "generate_template")
+            workflow.add_edge("generate_template", "transform_tone")
+            workflow.add_edge("transform_tone", "generate_email")
         workflow.add_edge("generate_email", "evaluate_email")
         
         # Conditional edge: evaluate -> regenerate or end
@@ -114,6 +216,47 @@ class EmailExpertAgent:
         
         return workflow.compile()
     
+    def _plan_node(self, state: EmailAgentState, config: Optional[RunnableConfig] = None) -> EmailAgentState:
+        """Extract context, generate the template and adjust its tone in one structured LLM call."""
+        logger.info("Planning email (context, template and tone)...")
+        enhanced_query = state.get("enhanced_query") or {}
+        key_points = enhanced_query.get("key_points", [])
+        plan_prompt = EMAIL_PLAN_PROMPT_TEMPLATE.format(
+            prompt=self._extract_original_prompt(state["prompt"]),
+            email_type=enhanced_query.get("email_type", "unknown"),
+            tone=enhanced_query.get("tone", "unknown"),
+            recipient_type=enhanced_query.get("recipient_type", "unknown"),
+            key_points=", ".join(key_points) if key_points else "N/A"
+        )
+        
+        try:
+            plan = self.planner.invoke([
+                SystemMessage(content=EMAIL_PLAN_SYSTEM_PROMPT),
+                HumanMessage(content=plan_prompt)
+            ], config=config)
+            if plan is None:
+                raise ValueError("planner returned no structured output")
+        except Exception as e:
+            logger.error(f"Planning failed: {e}")
+            logger.warning("Falling back to step-by-step context, template and tone tools")
+            state = self._extract_context_node(state)
+            state = self._generate_template_node(state)
+            return self._transform_tone_node(state)
+        
+        state["extracted_context"] = {
+            "extracted_context": plan.extracted_context,
+            "intent": plan.intent,
+            "key_entities": plan.key_entities.model_dump(),
+            "relationships": [],
+            "email_type": plan.email_type,
+            "urgency": plan.urgency,
+            "formality_level": plan.formality_level
+        }
+        state["email_template"] = {"email_template": plan.email_template, "structure": {}, "sections": {}}
+        state["tone_adjusted_content"] = plan.tone_adjusted_email or plan.email_template
+        logger.info(f"Plan ready: intent={plan.intent}, template={len(plan.email_template)} chars")
+        return state
+    
     def _extract_context_node(self, state: EmailAgentState) -> EmailAgentState:
         """Extract context from prompt."""
         logger.info("Extracting context...")
@@ -159,11 +302,16 @@ class EmailExpertAgent:
             }
         return state
     
+    def _split_feedback(self, prompt: str) -> Tuple[str, str]:
+        """Split prompt into (original prompt, feedback section) in a single scan."""
+        original, marker, feedback = prompt.partition("=== CRITICAL FEEDBACK")
+        if not marker:
+            return prompt, ""
+        return original.strip(), "\n\n" + marker + feedback
+    
     def _extract_original_prompt(self, prompt: str) -> str:
         """Extract original prompt by removing feedback section if present."""
-        if "=== CRITICAL FEEDBACK" in prompt:
-            return prompt.split("=== CRITICAL FEEDBACK")[0].strip()
-        return prompt
+        return self._split_feedback(prompt)[0]
     
     def _transform_tone_node(self, state: EmailAgentState) -> EmailAgentState:
         """Transform email tone."""
@@ -194,15 +342,13 @@ class EmailExpertAgent:
         Returns:
             Tuple of (response_metadata, usage_metadata, finish_reason)
         """
-        response_metadata = {}
-        usage_metadata = {}
-        finish_reason = None
+        response_metadata = getattr(response, 'response_metadata', None) or {}
+        finish_reason = response_metadata.get('finish_reason')
         
-        if hasattr(response, 'response_metadata'):
-            response_metadata = response.response_metadata or {}
-            finish_reason = response_metadata.get('finish_reason')
-            
-            # Check for usage_metadata in response_metadata
+        # AIMessage carries standardized usage counts; older clients only put
+        # them in response_metadata
+        usage_metadata = getattr(response, 'usage_metadata', None) or {}
+        if not usage_metadata:
             if 'usage_metadata' in response_metadata:
                 usage_metadata = response_metadata['usage_metadata']
             elif 'input_tokens' in response_metadata or 'output_tokens' in response_metadata:
@@ -225,22 +371,30 @@ class EmailExpertAgent:
         Returns:
             Extracted text content or None if not found
         """
-        if not response:
+        content = getattr(response, 'content', None)
+        if not content:
             return None
         
-        # ChatGoogleGenerativeAI responses have .content attribute
-        if hasattr(response, 'content'):
-            content = response.content
-            if content:
-                return str(content).strip()
+        # ChatGoogleGenerativeAI normally returns a plain string
+        if isinstance(content, str):
+            return content.strip()
         
-        return None
+        # Multi-part content: join the text parts
+        if isinstance(content, list):
+            text = "".join(
+                part if isinstance(part, str) else part.get("text", "")
+                for part in content
+                if isinstance(part, (str, dict))
+            )
+            return text.strip() or None
+        
+        return str(content).strip()
     
     def _is_email_complete(self, text: str) -> bool:
-        """Check if email content appears complete (basic length check)."""
+        """Check if email content appears complete (basic length check on already-stripped text)."""
         if not text:
             return False
-        return len(text.strip()) >= MIN_EMAIL_LENGTH
+        return len(text) >= MIN_EMAIL_LENGTH
     
     def _build_email_prompt(self, state: EmailAgentState) -> str:
         """Build user prompt from state for email generation."""
@@ -251,13 +405,22 @@ class EmailExpertAgent:
         current_prompt = state.get("prompt", "")
         
         # Extract original query (before feedback was added)
-        original_query = self._extract_original_prompt(current_prompt)
-        feedback_section = ""
-        if "=== CRITICAL FEEDBACK" in current_prompt:
-            parts = current_prompt.split("=== CRITICAL FEEDBACK", 1)
-            feedback_section = "\n\n=== CRITICAL FEEDBACK" + parts[1] if len(parts) > 1 else ""
+        original_query, feedback_section = self._split_feedback(current_prompt)
+        if feedback_section:
             logger.debug(f"Extracted original query ({len(original_query)} chars) and feedback ({len(feedback_section)} chars)")
         
+        # Regenerations send only the previous draft and the evaluator's feedback;
+        # the requirements and template already shaped that draft, so re-sending
+        # them would grow the input on every retry
+        previous_email = state.get("generated_email") or ""
+        if attempt > 0 and feedback_section and previous_email:
+            logger.info(f"Building revision prompt for regeneration attempt {attempt}")
+            return EMAIL_REVISION_PROMPT_TEMPLATE.format(
+                original_query=original_query,
+                feedback=feedback_section.strip(),
+                previous_email=previous_email
+            )
+        
         # Build prompt from enhanced query and context
         enhanced_instruction = enhanced_query.get("enhanced_instruction", original_query)
         email_type = enhanced_query.get("email_type", extracted_context.get("email_type", "general"))
@@ -291,15 +454,27 @@ class EmailExpertAgent:
         
         return user_prompt
     
-    def _invoke_llm_with_retry(self, messages: list, state: EmailAgentState) -> Optional[str]:
-        """Invoke LLM with MAX_TOKENS retry logic if needed."""
+    def _invoke_llm_with_retry(
+        self,
+        messages: list,
+        state: EmailAgentState,
+        llm=None,
+        config: Optional[RunnableConfig] = None
+    ) -> Optional[str]:
+        """
+        Invoke LLM (self.llm unless given) with MAX_TOKENS retry logic if needed.
+        
+        config is the node's run config; passing it on explicitly keeps the LLM
+        calls attached to the graph run (callbacks, token streaming) on Python
+        versions where it is not propagated automatically to executor threads.
+        """
         max_tokens_retry_count = state.get("max_tokens_retry_count", 0)
         max_retries = MAX_TOKENS_RETRY_MAX_ATTEMPTS
         
         try:
             # Initial LLM invocation
-            response = self.llm.invoke(messages)
-            response_metadata, usage_metadata, finish_reason = self._extract_usage_metadata(response)
+            response = (llm or self.llm).invoke(messages, config=config)
+            _, usage_metadata, finish_reason = self._extract_usage_metadata(response)
             
             # Log finish reason
             if finish_reason:
@@ -308,10 +483,9 @@ class EmailExpertAgent:
                     logger.warning(f"Response truncated due to MAX_TOKENS limit ({MAX_TOKENS})")
             
             # Check for safety filters
-            if isinstance(response_metadata, dict):
-                if finish_reason in ['SAFETY', 'RECITATION', 'OTHER']:
-                    logger.error(f"Response blocked by safety filter! Finish reason: {finish_reason}")
-                    return None
+            if finish_reason in ['SAFETY', 'RECITATION', 'OTHER']:
+                logger.error(f"Response blocked by safety filter! Finish reason: {finish_reason}")
+                return None
             
             # Extract content
             generated_text = self._extract_content_from_response(response)
@@ -328,13 +502,7 @@ class EmailExpertAgent:
                     state["max_tokens_retry_count"] = max_tokens_retry_count + 1
                     
                     # Retry with higher limit
-                    retry_llm = ChatGoogleGenerativeAI(
-                        model=GEMINI_MODEL,
-                        google_api_key=GEMINI_API_KEY,
-                        temperature=TEMPERATURE,
-                        max_output_tokens=retry_max_tokens
-                    )
-                    retry_response = retry_llm.invoke(messages)
+                    retry_response = self.llm_retry.invoke(messages, config=config)
                     _, retry_usage_metadata, finish_reason = self._extract_usage_metadata(retry_response)
                     
                     if retry_usage_metadata:
@@ -356,7 +524,7 @@ class EmailExpertAgent:
             logger.error(f"LLM invocation failed: {e}", exc_info=True)
             return None
     
-    def _generate_email_node(self, state: EmailAgentState) -> EmailAgentState:
+    def _generate_email_node(self, state: EmailAgentState, config: Optional[RunnableConfig] = None) -> EmailAgentState:
         """Generate email using Gemini."""
         logger.info("Generating email...")
         
@@ -374,17 +542,24 @@ class EmailExpertAgent:
             
             # Build LLM messages
             messages = [
-                SystemMessage(content=EMAIL_SYSTEM_PROMPT),
+                self._system_message,
                 HumanMessage(content=user_prompt)
             ]
             
             logger.debug(f"Calling LLM with prompt length: {len(user_prompt)} chars")
             
             # Invoke LLM with retry logic
-            generated_text = self._invoke_llm_with_retry(messages, state)
+            # First attempt is drafted by the fast model when enabled;
+            # regenerations after a failed evaluation use the main model
+            llm = self.llm
+            if self.draft_llm and state.get("attempt", 0) == 0:
+                logger.info(f"Drafting with {DRAFT_MODEL}")
+                llm = self.draft_llm
+            generated_text = self._invoke_llm_with_retry(messages, state, llm, config)
             
             # Fallback chain: tone-adjusted content -> basic template
-            if not generated_text or len(generated_text.strip()) == 0:
+            # (LLM text is already stripped by _extract_content_from_response)
+            if not generated_text:
                 logger.warning("LLM returned empty response, using tone-adjusted content")
                 generated_text = state.get("tone_adjusted_content", "")
                 if not generated_text:
@@ -408,7 +583,6 @@ class EmailExpertAgent:
         
         if not USE_EVALUATOR:
             logger.info("Evaluator disabled, skipping evaluation")
-            from .config import EVALUATOR_DEFAULT_SCORE
             state["evaluation"] = {"score": EVALUATOR_DEFAULT_SCORE, "passed": True, "feedback": "Evaluator disabled"}
             state["final_email"] = state.get("generated_email", "")
             return state
@@ -423,7 +597,6 @@ class EmailExpertAgent:
         except Exception as e:
             logger.error(f"Evaluation failed: {e}")
             # Fallback: assume passed
-            from .config import EVALUATOR_DEFAULT_SCORE
             state["evaluation"] = {"score": EVALUATOR_DEFAULT_SCORE, "passed": True, "feedback": f"Evaluation error: {e}"}
         
         # Set final email
@@ -510,15 +683,77 @@ class EmailExpertAgent:
             if evaluation.get("critical_errors"):
                 logger.info(f"Critical errors: {len(evaluation['critical_errors'])} issues to fix")
             return "regenerate"
-        elif attempt >= EVALUATOR_MAX_RETRIES:
-            logger.warning(f"Max retries reached ({EVALUATOR_MAX_RETRIES}), ending workflow")
-            return "end"
-        elif passed:
+        
+        if passed:
             logger.info(f"Email passed evaluation (score: {score:.1f}), ending workflow")
-            return "end"
         else:
-            logger.warning(f"Unexpected state: passed={passed}, attempt={attempt}")
-            return "end"
+            logger.warning(f"Max retries reached ({EVALUATOR_MAX_RETRIES}), ending workflow")
+        return "end"
+    
+    def _build_initial_state(
+        self,
+        prompt: str,
+        enhanced_query: Optional[Dict[str, Any]],
+        max_length: Optional[int],
+        temperature: Optional[float]
+    ) -> EmailAgentState:
+        """Build the initial workflow state for a single request."""
+        return {
+            "prompt": prompt,
+            "enhanced_query": enhanced_query,
+            "extracted_context": None,
+            "email_template": None,
+            "tone_adjusted_content": None,
+            "generated_email": None,
+            "evaluation": None,
+            "attempt": 0,
+            "final_email": "",
+            "max_length": max_length or MAX_TOKENS,
+            "temperature": TEMPERATURE if temperature is None else temperature
+        }
+    
+    def _response_cache_key(self, prompt: str, enhanced_query: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Build the response cache key for a request, or None if caching is disabled.
+        
+        The request's max_length and temperature are not part of the key: the
+        LLMs are built with the configured MAX_TOKENS and TEMPERATURE, so they
+        do not change the generated email.
+        """
+        if self._response_cache is None:
+            return None
+        
+        query = enhanced_query or {}
+        key_fields = {
+            "prompt": " ".join(prompt.split()),
+            "email_type": query.get("email_type"),
+            "tone": query.get("tone"),
+            "recipient_type": query.get("recipient_type"),
+            "key_points": sorted(str(p) for p in query.get("key_points") or []),
+            "special_requirements": sorted(str(r) for r in query.get("special_requirements") or [])
+        }
+        return hashlib.sha256(json.dumps(key_fields, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def _response_cache_get(self, key: Optional[str]) -> Optional[str]:
+        """Return the cached email for a key, or None on a miss."""
+        if key is None:
+            return None
+        with self._response_cache_lock:
+            cached = self._response_cache.get(key)
+        if cached is not None:
+            logger.info(f"Email response cache hit: {len(cached)} chars")
+        return cached
+    
+    def _response_cache_put(self, key: Optional[str], email: str) -> None:
+        """Store a finished email (fallback emails are never cached)."""
+        if key is None:
+            return
+        with self._response_cache_lock:
+            self._response_cache[key] = email
+    
+    def _fallback_email(self, prompt: str) -> str:
+        """Minimal email returned when the workflow produces nothing."""
+        return f"Subject: Email Subject\n\nDear Recipient,\n\n{prompt}\n\nBest regards,\n[Your Name]"
     
     def generate(
         self,
@@ -544,20 +779,13 @@ class EmailExpertAgent:
         logger.debug(f"Enhanced query provided: {enhanced_query is not None}")
         logger.debug(f"max_length: {max_length}, temperature: {temperature}")
         
+        cache_key = self._response_cache_key(prompt, enhanced_query)
+        cached = self._response_cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Initialize state
-        initial_state: EmailAgentState = {
-            "prompt": prompt,
-            "enhanced_query": enhanced_query,
-            "extracted_context": None,
-            "email_template": None,
-            "tone_adjusted_content": None,
-            "generated_email": None,
-            "evaluation": None,
-            "attempt": 0,
-            "final_email": "",
-            "max_length": max_length or MAX_TOKENS,
-            "temperature": temperature or TEMPERATURE
-        }
+        initial_state = self._build_initial_state(prompt, enhanced_query, max_length, temperature)
         
         # Run workflow
         try:
@@ -568,14 +796,218 @@ class EmailExpertAgent:
             
             if not result:
                 logger.warning("No email generated in final_state, using fallback")
-                result = f"Subject: Email Subject\n\nDear Recipient,\n\n{prompt}\n\nBest regards,\n[Your Name]"
+                return self._fallback_email(prompt)
+            
+            self._response_cache_put(cache_key, result)
+            logger.info(f"Email generated successfully: {len(result)} chars")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Workflow failed: {e}", exc_info=True)
+            logger.warning("Returning fallback email")
+            return self._fallback_email(prompt)
+    
+    async def agenerate(
+        self,
+        prompt: str,
+        enhanced_query: Optional[Dict[str, Any]] = None,
+        max_length: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        """
+        Generate email asynchronously using the LangGraph workflow.
+        
+        The workflow nodes form a dependency chain (context -> template -> tone
+        -> email -> evaluation), so a single request cannot overlap its Gemini
+        calls. What ainvoke() buys is request-level concurrency: the blocking
+        nodes run in the executor, so the event loop keeps serving while one
+        request waits on Gemini. At most EMAIL_MAX_CONCURRENCY workflows run at
+        once to stay within API rate limits.
+        
+        Args:
+            prompt: User query
+            enhanced_query: Enhanced query from router (optional)
+            max_length: Maximum generation length (optional, uses config default)
+            temperature: Sampling temperature (optional, uses config default)
+            
+        Returns:
+            Generated email text
+        """
+        logger.info("EmailExpertAgent.agenerate() called")
+        
+        cache_key = self._response_cache_key(prompt, enhanced_query)
+        cached = self._response_cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if self._generate_semaphore is None:
+            self._generate_semaphore = asyncio.Semaphore(EMAIL_MAX_CONCURRENCY)
+        
+        initial_state = self._build_initial_state(prompt, enhanced_query, max_length, temperature)
+        
+        try:
+            async with self._generate_semaphore:
+                final_state = await self.workflow.ainvoke(initial_state)
+            
+            result = final_state.get("final_email", "")
+            
+            if not result:
+                logger.warning("No email generated in final_state, using fallback")
+                return self._fallback_email(prompt)
             
+            self._response_cache_put(cache_key, result)
             logger.info(f"Email generated successfully: {len(result)} chars")
             return result
             
         except Exception as e:
             logger.error(f"Workflow failed: {e}", exc_info=True)
             logger.warning("Returning fallback email")
-            # Fallback email
-            fallback = f"Subject: Email Subject\n\nDear Recipient,\n\n{prompt}\n\nBest regards,\n[Your Name]"
-            return fallback
+            return self._fallback_email(prompt)
+    
+    async def astream(
+        self,
+        prompt: str,
+        enhanced_query: Optional[Dict[str, Any]] = None,
+        max_length: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream email generation as the LLM produces it.
+        
+        Yields {"type": "token", "draft_id", "attempt", "text"} events for the
+        email being generated, then a single {"type": "final", "text"} event
+        with the email the workflow settled on. Each LLM draft (an evaluator
+        regeneration or a MAX_TOKENS retry) has its own draft_id; when it
+        changes, clients should discard the text shown so far.
+        
+        Args:
+            prompt: User query
+            enhanced_query: Enhanced query from router (optional)
+            max_length: Maximum generation length (optional, uses config default)
+            temperature: Sampling temperature (optional, uses config default)
+            
+        Yields:
+            Token events followed by the final event
+        """
+        logger.info("EmailExpertAgent.astream() called")
+        
+        cache_key = self._response_cache_key(prompt, enhanced_query)
+        cached = self._response_cache_get(cache_key)
+        if cached is not None:
+            yield {"type": "final", "text": cached}
+            return
+        
+        if self._generate_semaphore is None:
+            self._generate_semaphore = asyncio.Semaphore(EMAIL_MAX_CONCURRENCY)
+        
+        state = self._build_initial_state(prompt, enhanced_query, max_length, temperature)
+        completed = False
+        
+        try:
+            async with self._generate_semaphore:
+                # "messages" carries LLM tokens from inside nodes, "values" the
+                # state after each step (the last one is the final state)
+                async for mode, payload in self.workflow.astream(state, stream_mode=["messages", "values"]):
+                    if mode == "values":
+                        state = payload
+                        continue
+                    chunk, metadata = payload
+                    if metadata.get("langgraph_node") != "generate_email":
+                        continue
+                    if isinstance(chunk.content, str) and chunk.content:
+                        yield {
+                            "type": "token",
+                            "draft_id": chunk.id,
+                            "attempt": state.get("attempt", 0),
+                            "text": chunk.content
+                        }
+            completed = True
+        except Exception as e:
+            logger.error(f"Streaming workflow failed: {e}", exc_info=True)
+            logger.warning("Returning fallback email")
+        
+        # After a failure the state may hold a draft that never passed
+        # evaluation, so only a completed run's email is returned and cached
+        result = state.get("final_email", "") if completed else ""
+        if result:
+            self._response_cache_put(cache_key, result)
+        else:
+            result = self._fallback_email(prompt)
+        logger.info(f"Email stream complete: {len(result)} chars")
+        yield {"type": "final", "text": result}
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        enhanced_queries: Optional[List[Optional[Dict[str, Any]]]] = None,
+        max_length: Optional[int] = None,
+        temperature: Optional[float] = None,
+        max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """
+        Generate several emails with one batched workflow call.
+        
+        The workflows run concurrently, so the Gemini round-trips of different
+        requests overlap instead of queueing behind each other.
+        
+        Args:
+            prompts: User queries
+            enhanced_queries: Enhanced queries aligned with prompts (optional)
+            max_length: Maximum generation length (optional, uses config default)
+            temperature: Sampling temperature (optional, uses config default)
+            max_concurrency: Upper bound on workflows in flight (optional)
+            
+        Returns:
+            Generated email texts, in the same order as prompts
+        """
+        logger.info(f"EmailExpertAgent.generate_batch() called with {len(prompts)} prompts")
+        
+        if enhanced_queries is None:
+            enhanced_queries = [None] * len(prompts)
+        if len(enhanced_queries) != len(prompts):
+            raise ValueError("enhanced_queries must be aligned with prompts")
+        
+        cache_keys = [
+            self._response_cache_key(prompt, enhanced_query)
+            for prompt, enhanced_query in zip(prompts, enhanced_queries)
+        ]
+        results: List[Optional[str]] = [self._response_cache_get(key) for key in cache_keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        initial_states = [
+            self._build_initial_state(prompts[i], enhanced_queries[i], max_length, temperature)
+            for i in pending
+        ]
+        config = {"max_concurrency": max_concurrency} if max_concurrency else None
+        
+        final_states = self.workflow.batch(initial_states, config=config, return_exceptions=True) if pending else []
+        
+        for i, final_state in zip(pending, final_states):
+            if isinstance(final_state, Exception):
+                logger.error(f"Workflow failed for batched prompt: {final_state}")
+                results[i] = self._fallback_email(prompts[i])
+                continue
+            result = final_state.get("final_email", "")
+            if result:
+                self._response_cache_put(cache_keys[i], result)
+            results[i] = result or self._fallback_email(prompts[i])
+        
+        logger.info(f"Batch generation complete: {len(results)} emails")
+        return results
+
+
+# Process-wide agent: tools, LLM clients and the compiled workflow are built once.
+# The compiled graph is reentrant (per-request data lives in the state dict passed
+# to invoke), so one instance can serve concurrent requests.
+_agent: Optional[EmailExpertAgent] = None
+_agent_lock = threading.Lock()
+
+
+def get_agent() -> EmailExpertAgent:
+    """Return the shared EmailExpertAgent, creating it on first call."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = EmailExpertAgent()
+    return _agent
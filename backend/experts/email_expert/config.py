@@ -12,6 +12,7 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("EMAIL_EXPERT_MODEL", "gemini-2.5-flash")
 EVALUATOR_MODEL = os.getenv("EVALUATOR_MODEL", "gemini-2.5-flash")
+DRAFT_MODEL = os.getenv("EMAIL_DRAFT_MODEL", "gemini-2.5-flash-lite")
 
 # Model fallback list for tools (in order of preference)
 MODEL_FALLBACK_LIST = ["gemini-2.5-flash", "gemini-1.5-flash", "gemini-1.5-pro"]
@@ -19,11 +20,19 @@ MODEL_FALLBACK_LIST = ["gemini-2.5-flash", "gemini-1.5-flash", "gemini-1.5-pro"]
 # Generation Parameters
 MAX_TOKENS = int(os.getenv("EMAIL_MAX_TOKENS", "2000"))
 TEMPERATURE = float(os.getenv("EMAIL_TEMPERATURE", "0.5"))
+EMAIL_MAX_CONCURRENCY = int(os.getenv("EMAIL_MAX_CONCURRENCY", "8"))  # Workflows in flight via agenerate()
+
+# Response cache for whole-workflow results (enabled only when EMAIL_TEMPERATURE <= EMAIL_CACHE_MAX_TEMPERATURE)
+EMAIL_CACHE_SIZE = int(os.getenv("EMAIL_CACHE_SIZE", "256"))  # 0 disables the response cache
+EMAIL_CACHE_TTL = float(os.getenv("EMAIL_CACHE_TTL", "3600"))
+EMAIL_CACHE_MAX_TEMPERATURE = float(os.getenv("EMAIL_CACHE_MAX_TEMPERATURE", "0.2"))
 
 # Email-specific settings
 USE_EVALUATOR = os.getenv("USE_EMAIL_EVALUATOR", "true").lower() == "true"
 EVALUATOR_THRESHOLD = float(os.getenv("EVALUATOR_THRESHOLD", "7.0"))
 EVALUATOR_MAX_RETRIES = int(os.getenv("EVALUATOR_MAX_RETRIES", "2"))
+USE_PLANNER = os.getenv("USE_EMAIL_PLANNER", "false").lower() == "true"  # One structured call replaces context/template/tone
+USE_SPECULATIVE_DRAFTING = os.getenv("USE_SPECULATIVE_DRAFTING", "false").lower() == "true"  # First draft from DRAFT_MODEL
 
 # Evaluator scoring parameters
 EVALUATOR_PENALTY_PER_ISSUE = float(os.getenv("EVALUATOR_PENALTY_PER_ISSUE", "2.5"))
@@ -31,6 +40,9 @@ EVALUATOR_MAX_PENALTY = float(os.getenv("EVALUATOR_MAX_PENALTY", "8.0"))
 EVALUATOR_CRITICAL_ISSUE_SCORE_CAP = float(os.getenv("EVALUATOR_CRITICAL_ISSUE_SCORE_CAP", "5.0"))
 EVALUATOR_DEFAULT_SCORE = float(os.getenv("EVALUATOR_DEFAULT_SCORE", "10.0"))
 EVALUATOR_MAX_CRITICAL_ERRORS_DISPLAY = int(os.getenv("EVALUATOR_MAX_CRITICAL_ERRORS_DISPLAY", "5"))
+EVALUATOR_CACHE_SIZE = int(os.getenv("EVALUATOR_CACHE_SIZE", "512"))  # 0 disables the evaluation cache
+# Shared evaluator pool; each evaluation keeps up to 2 Gemini calls in it, so size it to 2 * EMAIL_MAX_CONCURRENCY
+EVALUATOR_LLM_POOL_SIZE = int(os.getenv("EVALUATOR_LLM_POOL_SIZE", str(2 * EMAIL_MAX_CONCURRENCY)))
 
 # Email generation retry parameters
 MAX_TOKENS_RETRY_MULTIPLIER = float(os.getenv("MAX_TOKENS_RETRY_MULTIPLIER", "2.0"))
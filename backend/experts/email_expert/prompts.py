@@ -27,3 +27,35 @@ Special Requirements: {special_requirements}
 
 Original request: {original_query}"""
 
+# Regeneration prompt: revise the previous draft using only the evaluator's feedback
+EMAIL_REVISION_PROMPT_TEMPLATE = """Revise the email below so that it fixes every issue the evaluator raised. Keep everything that is already correct.
+
+Original request: {original_query}
+
+{feedback}
+
+=== EMAIL TO REVISE ===
+{previous_email}"""
+
+# Planner prompts: context extraction, template and tone adjustment in one structured call
+EMAIL_PLAN_SYSTEM_PROMPT = """You plan professional emails. For each request, analyze what the user wants, draft an email template with Subject, Greeting, Body paragraphs and Closing, and then rewrite that template in the tone the request calls for.
+
+Use the specific dates, names and details from the request; never invent facts that are not in it."""
+
+EMAIL_PLAN_PROMPT_TEMPLATE = """Plan an email for this request:
+
+USER REQUEST: {prompt}
+
+Email Type: {email_type}
+Tone: {tone}
+Recipient: {recipient_type}
+Key Points: {key_points}
+
+Return:
+- extracted_context: rich summary of the full context, purpose and requirements
+- intent and email_type: e.g. sick_leave, vacation, meeting, thank_you, inquiry, complaint, general
+- key_entities: dates, recipient, sender, reason, duration and deadline mentioned in the request
+- urgency: urgent/normal/low
+- formality_level: formal/semi-formal/casual/professional
+- email_template: complete email template (Subject, Greeting, Body, Closing)
+- tone_adjusted_email: the template rewritten in the required tone"""
@@ -4,21 +4,36 @@ Shared utilities for all email expert tools.
 """
 import logging
 import json
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, Tuple
 import google.generativeai as genai
 from utils.json_parser import parse_json_robust
 from ..config import MODEL_FALLBACK_LIST
 
 logger = logging.getLogger(__name__)
 
+# Every email tool initializes a model on construction; share one instance per
+# (api_key, preferred_model, system_instruction) instead of resolving the
+# fallback list each time.
+_MODEL_CACHE: Dict[Tuple[str, Optional[str], Optional[str]], genai.GenerativeModel] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
 
-def init_gemini_model(api_key: str, preferred_model: Optional[str] = None) -> Optional[genai.GenerativeModel]:
+# genai.configure() replaces the SDK's global client; only redo it when the key changes
+_configured_api_key: Optional[str] = None
+
+
+def init_gemini_model(
+    api_key: str,
+    preferred_model: Optional[str] = None,
+    system_instruction: Optional[str] = None
+) -> Optional[genai.GenerativeModel]:
     """
     Initialize Gemini model with fallback support.
     
     Args:
         api_key: Gemini API key
         preferred_model: Preferred model name (optional)
+        system_instruction: System instruction bound to the model (optional)
         
     Returns:
         Initialized GenerativeModel or None if initialization fails
@@ -27,8 +42,30 @@ def init_gemini_model(api_key: str, preferred_model: Optional[str] = None) -> Op
         logger.warning("No API key provided for Gemini model initialization")
         return None
     
+    cache_key = (api_key, preferred_model, system_instruction)
+    with _MODEL_CACHE_LOCK:
+        cached = _MODEL_CACHE.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Reusing cached Gemini model: {cached.model_name}")
+            return cached
+        
+        model = _create_gemini_model(api_key, preferred_model, system_instruction)
+        if model is not None:
+            _MODEL_CACHE[cache_key] = model
+        return model
+
+
+def _create_gemini_model(
+    api_key: str,
+    preferred_model: Optional[str],
+    system_instruction: Optional[str]
+) -> Optional[genai.GenerativeModel]:
+    """Configure the SDK and build the first model that initializes successfully."""
+    global _configured_api_key
     try:
-        genai.configure(api_key=api_key)
+        if api_key != _configured_api_key:
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
         
         # Try preferred model first, then fallback list
         models_to_try = []
@@ -38,7 +75,7 @@ def init_gemini_model(api_key: str, preferred_model: Optional[str] = None) -> Op
         
         for model_name in models_to_try:
             try:
-                model = genai.GenerativeModel(model_name)
+                model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
                 logger.info(f"Initialized Gemini model: {model_name}")
                 return model
             except Exception:
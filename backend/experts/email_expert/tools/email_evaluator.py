@@ -2,19 +2,123 @@
 Email Evaluator - Enhanced with strict validation and programmatic checks
 """
 
+import copy
+import hashlib
 import logging
 import json
 import re
-from typing import Dict, Any, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+from utils.fast_regex import compile_pattern
 from .base_tool import init_gemini_model, parse_json_response
 from ..config import (
     EVALUATOR_PENALTY_PER_ISSUE, EVALUATOR_MAX_PENALTY,
     EVALUATOR_CRITICAL_ISSUE_SCORE_CAP, EVALUATOR_DEFAULT_SCORE,
-    EVALUATOR_MAX_CRITICAL_ERRORS_DISPLAY
+    EVALUATOR_MAX_CRITICAL_ERRORS_DISPLAY, EVALUATOR_CACHE_SIZE,
+    EVALUATOR_LLM_POOL_SIZE, MIN_EMAIL_LENGTH
 )
 
 logger = logging.getLogger(__name__)
 
+# Month names, full or abbreviated, shared by the date alternatives below
+_MONTHS = (
+    r'(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|'
+    r'Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)'
+)
+
+# Date patterns used by extract_dates_from_text, compiled once at import (with
+# re2's linear-time engine when available). They are run separately rather than
+# fused into one alternation: a range match would otherwise consume the start
+# of an adjacent date ("3-4 May 2025-11-17" must still yield 2025-11-17)
+_DATE_PATTERNS = (
+    # 17-18 November, 3-4 May 2025
+    compile_pattern(rf'\b\d{{1,2}}[-–]\d{{1,2}}\s+{_MONTHS}(?:\s+\d{{4}})?\b', ignore_case=True),
+    # November 17-18, 2025
+    compile_pattern(rf'\b{_MONTHS}\s+\d{{1,2}}[-–]\d{{1,2}}(?:,?\s+\d{{4}})?\b', ignore_case=True),
+    # Individual dates like November 17, Dec 10, 2025-11-17
+    compile_pattern(
+        rf'\b(?:\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}[-/]\d{{1,2}}[-/]\d{{2,4}}|{_MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?)\b',
+        ignore_case=True
+    ),
+)
+# Recipient fallback: HR mentions (plain substring semantics, as before)
+_HR_RE = re.compile(r'hr|human resource', re.IGNORECASE)
+_DATE_NORM_TABLE = str.maketrans('', '', ',.')
+_NUM_RE = re.compile(r'\d+')
+_MONTH3 = frozenset({'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'})
+# Every date pattern contains a digit; text without one cannot hold a date
+_DIGIT_RE = re.compile(r'\d')
+
+# Shared pool for the evaluator's Gemini calls. Tasks submitted here never wait
+# on other tasks in the pool, so concurrent evaluate() calls cannot deadlock.
+_LLM_CALL_EXECUTOR = ThreadPoolExecutor(max_workers=EVALUATOR_LLM_POOL_SIZE, thread_name_prefix="email-evaluator")
+
+# (normalized text, three-letter month or None, numbers) for one date string
+_DateToken = Tuple[str, Optional[str], FrozenSet[str]]
+
+
+@lru_cache(maxsize=256)
+def _parse_date_token(date: str) -> _DateToken:
+    """Normalize a date string and pull out its month and numbers (cached, dates recur across retries)."""
+    norm = date.lower().translate(_DATE_NORM_TABLE)
+    # Date tokens come from _DATE_PATTERNS, so a month can only appear as its own word
+    month = next((word[:3] for word in norm.split() if word[:3] in _MONTH3), None)
+    return norm, month, frozenset(_NUM_RE.findall(norm))
+
+
+# Highest overall_score the rubric below allows
+_MAX_LLM_SCORE = 10.0
+
+# Static evaluation rubric. Sent once as the evaluator model's system
+# instruction so each request only carries the prompt and the email.
+_EVAL_SYSTEM_INSTRUCTION = """You are a STRICT email evaluator. Compare the GENERATED EMAIL with the USER'S REQUEST.
+
+Score 0-10 each (be harsh on errors):
+- completeness: every requested detail present; dates (day, month, year) and recipient (HR vs manager vs named person) exact
+- structure: subject line, greeting to the correct recipient, body with a clear request, professional closing
+- accuracy: dates, recipient and context exactly as requested (e.g. sick leave vs vacation vs job posting)
+- tone: professional, suited to the situation
+- clarity: no contradictions, consistent tense, logical flow
+
+Rules:
+- Wrong dates: completeness and accuracy 0-2
+- Wrong recipient: completeness 0-3
+- Wrong context: accuracy 0-2
+- Past tense where the email should request something (e.g. "I have taken" for a leave request): clarity -2
+
+Return ONLY this JSON (no markdown):
+{"completeness": <0-10>, "structure": <0-10>, "accuracy": <0-10>, "tone": <0-10>, "clarity": <0-10>,
+ "overall_score": <average of the 5>, "feedback": "<issues found>",
+ "critical_errors": ["date, recipient or context errors"], "missing_elements": ["details missing from the request"]}"""
+
+
+# Structured output for evaluate(): Gemini returns a bare JSON object matching this
+# schema, so no markdown stripping or trailing-comma repair is needed
+_EVAL_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "completeness": {"type": "number"},
+            "structure": {"type": "number"},
+            "accuracy": {"type": "number"},
+            "tone": {"type": "number"},
+            "clarity": {"type": "number"},
+            "overall_score": {"type": "number"},
+            "feedback": {"type": "string"},
+            "critical_errors": {"type": "array", "items": {"type": "string"}},
+            "missing_elements": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": [
+            "completeness", "structure", "accuracy", "tone", "clarity",
+            "overall_score", "feedback", "critical_errors", "missing_elements"
+        ]
+    }
+}
+
 
 class EmailEvaluator:
     """Evaluates emails using hybrid approach: programmatic checks + LLM evaluation."""
@@ -37,26 +141,61 @@ class EmailEvaluator:
         self.model = init_gemini_model(self.api_key, evaluator_model)
         self.enabled = self.model is not None
         
+        # Dedicated model for evaluate() carrying the static rubric (shared across instances)
+        self.eval_model = None
+        if self.enabled:
+            self.eval_model = init_gemini_model(
+                self.api_key,
+                self.model.model_name,
+                system_instruction=_EVAL_SYSTEM_INSTRUCTION
+            )
+            self.enabled = self.eval_model is not None
+        
         if not self.enabled:
             logger.warning("Evaluator disabled: model initialization failed")
+        
+        # LRU cache of LLM evaluations keyed by a hash of (prompt, email)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _cache_key(self, prompt: str, email: str) -> str:
+        """Build the evaluation cache key for a (prompt, email) pair."""
+        return hashlib.blake2b(f"{prompt}\0{email}".encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached evaluation, or None on a miss."""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            self._cache.move_to_end(key)
+        return copy.deepcopy(cached)
+    
+    def _cache_put(self, key: str, evaluation: Dict[str, Any]) -> None:
+        """Store an evaluation, evicting the least recently used entry when full."""
+        if EVALUATOR_CACHE_SIZE <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = copy.deepcopy(evaluation)
+            self._cache.move_to_end(key)
+            while len(self._cache) > EVALUATOR_CACHE_SIZE:
+                self._cache.popitem(last=False)
     
     def extract_dates_from_text(self, text: str) -> List[str]:
-        """Extract dates from text in various formats."""
-        dates = []
-        
-        # Pattern 1: 17-18 November, Nov 17-18, etc.
-        pattern1 = r'\b(\d{1,2}[-–]\d{1,2}\s+(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)(?:\s+\d{4})?)\b'
-        dates.extend(re.findall(pattern1, text, re.IGNORECASE))
-        
-        # Pattern 2: November 17-18, 2025
-        pattern2 = r'\b((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2}[-–]\d{1,2}(?:,?\s+\d{4})?)\b'
-        dates.extend(re.findall(pattern2, text, re.IGNORECASE))
-        
-        # Pattern 3: Individual dates like November 17, Dec 10, 2025-11-17
-        pattern3 = r'\b(\d{4}-\d{2}-\d{2}|\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?)\b'
-        dates.extend(re.findall(pattern3, text, re.IGNORECASE))
+        """
+        Extract dates from text in various formats (each distinct date once).
         
-        return dates
+        >>> evaluator = EmailEvaluator.__new__(EmailEvaluator)
+        >>> evaluator.extract_dates_from_text("3-4 May 2025-11-17")
+        ['3-4 May 2025', '2025-11-17']
+        >>> evaluator.extract_dates_from_text("Off Nov 17-18, 2025, back Nov 19")
+        ['Nov 17-18, 2025', 'Nov 17', 'Nov 19']
+        """
+        if not _DIGIT_RE.search(text):
+            return []
+        return list(dict.fromkeys(
+            match.group(0) for pattern in _DATE_PATTERNS for match in pattern.finditer(text)
+        ))
     
     def check_recipient_match(self, prompt: str, email: str) -> Dict[str, Any]:
         """Check if recipient in email matches the prompt using LLM-based analysis."""
@@ -92,11 +231,10 @@ Return ONLY valid JSON:
                     if not check_result.get("recipient_match", True):
                         issues.extend(check_result.get("issues", []))
             except Exception as e:
-                logger.debug(f"LLM recipient check failed: {e}, using basic check")
+                logger.debug("LLM recipient check failed: %s, using basic check", e)
                 # Fallback to basic check
-                if "hr" in prompt.lower() or "human resource" in prompt.lower():
-                    if "hr" not in email.lower() and "human resource" not in email.lower():
-                        issues.append("Prompt mentions HR but email doesn't address HR")
+                if _HR_RE.search(prompt) and not _HR_RE.search(email):
+                    issues.append("Prompt mentions HR but email doesn't address HR")
         
         return {
             "passed": len(issues) == 0,
@@ -109,57 +247,58 @@ Return ONLY valid JSON:
         email_dates = self.extract_dates_from_text(email)
         
         issues = []
+        missing_dates = []
         
         if prompt_dates:
-            logger.debug(f"Prompt dates: {prompt_dates}")
-            logger.debug(f"Email dates: {email_dates}")
+            logger.debug("Prompt dates: %s", prompt_dates)
+            logger.debug("Email dates: %s", email_dates)
             
             # Check if email has dates
             if not email_dates:
                 issues.append(f"Prompt specifies dates {prompt_dates} but email has no dates")
+                missing_dates = prompt_dates
             else:
-                # Check for month/day mismatch
+                # Check for month/day mismatch (parse each date once, not per pair)
+                email_tokens = [_parse_date_token(email_date) for email_date in email_dates]
                 for prompt_date in prompt_dates:
-                    date_found = False
-                    for email_date in email_dates:
-                        # Normalize and compare
-                        if self._dates_match(prompt_date, email_date):
-                            date_found = True
-                            break
+                    prompt_token = _parse_date_token(prompt_date)
+                    date_found = any(
+                        self._date_tokens_match(prompt_token, email_token)
+                        for email_token in email_tokens
+                    )
                     
                     if not date_found:
                         issues.append(f"Prompt date '{prompt_date}' not found in email. Email has: {email_dates}")
+                        missing_dates.append(prompt_date)
         
         return {
             "passed": len(issues) == 0,
-            "issues": issues
+            "issues": issues,
+            "missing_dates": missing_dates
         }
     
-    def _dates_match(self, date1: str, date2: str) -> bool:
-        """Check if two date strings refer to the same date(s)."""
-        # Normalize both dates
-        d1_norm = date1.lower().replace(',', '').replace('.', '')
-        d2_norm = date2.lower().replace(',', '').replace('.', '')
+    def _dates_absent(self, dates: List[str], email: str) -> bool:
+        """
+        Confirm that none of the dates appears anywhere in the email text.
+        
+        Guards the no-LLM failure path against extraction misses: a date that is
+        written in the email but was not picked up by the patterns is not a
+        real mismatch.
+        """
+        email_norm = " ".join(email.lower().translate(_DATE_NORM_TABLE).split())
+        return not any(" ".join(_parse_date_token(date)[0].split()) in email_norm for date in dates)
+    
+    def _date_tokens_match(self, d1: _DateToken, d2: _DateToken) -> bool:
+        """Check if two parsed date tokens refer to the same date(s)."""
+        d1_norm, d1_month, d1_nums = d1
+        d2_norm, d2_month, d2_nums = d2
         
         # Direct substring match
         if d1_norm in d2_norm or d2_norm in d1_norm:
             return True
         
-        # Extract numbers and month names
-        d1_nums = re.findall(r'\d+', d1_norm)
-        d2_nums = re.findall(r'\d+', d2_norm)
-        
-        d1_month = re.search(r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)', d1_norm)
-        d2_month = re.search(r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)', d2_norm)
-        
-        # Check if month matches and at least one number matches
-        if d1_month and d2_month:
-            if d1_month.group(1)[:3] == d2_month.group(1)[:3]:
-                # Check if any numbers match
-                if set(d1_nums) & set(d2_nums):
-                    return True
-        
-        return False
+        # Month matches and at least one number matches
+        return d1_month is not None and d1_month == d2_month and bool(d1_nums & d2_nums)
     
     def check_context_match(self, prompt: str, email: str) -> Dict[str, Any]:
         """Check if email context matches the prompt intent using LLM-based analysis."""
@@ -196,39 +335,52 @@ Return ONLY valid JSON:
                     if not check_result.get("context_match", True):
                         issues.extend(check_result.get("issues", []))
             except Exception as e:
-                logger.debug(f"LLM context check failed: {e}, skipping context check")
+                logger.debug("LLM context check failed: %s, skipping context check", e)
         
         return {
             "passed": len(issues) == 0,
             "issues": issues
         }
     
-    def programmatic_checks(self, prompt: str, email: str) -> Dict[str, Any]:
-        """Run all programmatic checks before LLM evaluation."""
-        logger.debug(f"Running programmatic checks: prompt={len(prompt)} chars, email={len(email)} chars")
+    def programmatic_checks(
+        self,
+        prompt: str,
+        email: str,
+        date_check: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run all programmatic checks before LLM evaluation.
+        
+        A date check result the caller already computed can be passed in.
+        """
+        logger.debug("Running programmatic checks: prompt=%s chars, email=%s chars", len(prompt), len(email))
         all_issues = []
         
+        # The recipient and context checks are independent Gemini calls; overlap them
+        context_future = _LLM_CALL_EXECUTOR.submit(self.check_context_match, prompt, email)
+        
         # Recipient check
         recipient_check = self.check_recipient_match(prompt, email)
         if not recipient_check["passed"]:
-            logger.warning(f"Recipient check failed: {recipient_check['issues']}")
+            logger.warning("Recipient check failed: %s", recipient_check['issues'])
             all_issues.extend(recipient_check["issues"])
         
         # Date check
-        date_check = self.check_date_match(prompt, email)
+        if date_check is None:
+            date_check = self.check_date_match(prompt, email)
         if not date_check["passed"]:
-            logger.warning(f"Date check failed: {date_check['issues']}")
+            logger.warning("Date check failed: %s", date_check['issues'])
             all_issues.extend(date_check["issues"])
         
         # Context check
-        context_check = self.check_context_match(prompt, email)
+        context_check = context_future.result()
         if not context_check["passed"]:
-            logger.warning(f"Context check failed: {context_check['issues']}")
+            logger.warning("Context check failed: %s", context_check['issues'])
             all_issues.extend(context_check["issues"])
         
         # Calculate penalty score
         penalty = min(len(all_issues) * EVALUATOR_PENALTY_PER_ISSUE, EVALUATOR_MAX_PENALTY)
-        logger.info(f"Programmatic checks complete: {len(all_issues)} issues found, penalty: {penalty:.1f}")
+        logger.info("Programmatic checks complete: %s issues found, penalty: %.1f", len(all_issues), penalty)
         
         return {
             "passed": len(all_issues) == 0,
@@ -237,6 +389,83 @@ Return ONLY valid JSON:
             "num_critical_issues": len(all_issues)
         }
     
+    def _max_score_with_issues(self, num_issues: int) -> float:
+        """Best final score reachable once num_issues programmatic issues are known."""
+        penalty = min(num_issues * EVALUATOR_PENALTY_PER_ISSUE, EVALUATOR_MAX_PENALTY)
+        return min(max(0, _MAX_LLM_SCORE - penalty), EVALUATOR_CRITICAL_ISSUE_SCORE_CAP)
+    
+    def _deterministic_failure(self, issues: List[str], score: float) -> Dict[str, Any]:
+        """Failing evaluation built from programmatic issues alone (no LLM call)."""
+        return {
+            "score": score,
+            "passed": False,
+            "feedback": "CRITICAL ISSUES: " + "; ".join(issues),
+            "criteria_scores": {},
+            "critical_errors": issues
+        }
+    
+    def _generate_json_streaming(
+        self,
+        model,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Stream a JSON response and stop reading once the outer object closes.
+        
+        Tracks brace depth outside of string literals, so anything the model
+        appends after the JSON (closing fences, commentary) is never waited for.
+        The stream is cancelled on early exit so the HTTP/gRPC connection is not
+        left open until the server finishes generating.
+        """
+        parts = []
+        depth = 0
+        started = False
+        in_string = False
+        escaped = False
+        
+        response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+        for chunk in response:
+            # chunk.text raises on usage-only / finish-reason-only chunks
+            candidates = chunk.candidates
+            text = "".join(part.text for part in candidates[0].content.parts) if candidates else ""
+            parts.append(text)
+            for char in text:
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '{':
+                    depth += 1
+                    started = True
+                elif not started:
+                    continue
+                elif char == '"':
+                    in_string = True
+                elif char == '}':
+                    depth -= 1
+                    if depth == 0:
+                        logger.debug("Evaluation JSON complete, stopping stream early")
+                        self._close_stream(response)
+                        return "".join(parts)
+        
+        return "".join(parts)
+    
+    @staticmethod
+    def _close_stream(response) -> None:
+        """Cancel a partially consumed streaming response."""
+        stream = getattr(response, "_iterator", None)
+        stop = getattr(stream, "cancel", None) or getattr(stream, "close", None)
+        if stop is None:
+            return
+        try:
+            stop()
+        except Exception as e:
+            logger.debug("Could not cancel evaluation stream: %s", e)
+    
     def evaluate(self, prompt: str, generated_email: str) -> Dict[str, Any]:
         """
         Evaluate email against prompt using hybrid approach.
@@ -248,104 +477,75 @@ Return ONLY valid JSON:
         - criteria_scores (dict)
         """
         logger.info("EmailEvaluator.evaluate() called")
-        logger.debug(f"Prompt: {prompt[:100]}..., Email length: {len(generated_email)} chars")
+        logger.debug("Prompt: %s..., Email length: %s chars", prompt[:100], len(generated_email))
         
         if not self.enabled:
             logger.warning("Evaluator disabled, returning default pass")
             return {"score": EVALUATOR_DEFAULT_SCORE, "passed": True, "feedback": "Evaluator disabled"}
         
-        # First run programmatic checks
-        prog_checks = self.programmatic_checks(prompt, generated_email)
+        # Identical (prompt, email) pairs skip the checks and the Gemini round-trip
+        cache_key = self._cache_key(prompt, generated_email)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Evaluation cache hit: Score=%.1f, Passed=%s", cached['score'], cached['passed'])
+            return cached
         
-        if not prog_checks["passed"]:
-            logger.warning("Programmatic checks failed:")
-            for issue in prog_checks["issues"]:
-                logger.warning(f"  - {issue}")
+        # Deterministic bypass: an empty/junk email or a confirmed date mismatch
+        # (checked locally) already guarantees failure, so skip every Gemini call
+        if len(generated_email.strip()) < MIN_EMAIL_LENGTH:
+            logger.info("Email shorter than %s chars, failing without LLM evaluation", MIN_EMAIL_LENGTH)
+            return self._deterministic_failure(["Email is empty or too short to be a complete email"], 0.0)
         
-        # Enhanced LLM evaluation prompt
-        eval_prompt = f"""You are a STRICT email evaluator. Evaluate this email against the user's request.
-
-USER'S REQUEST: {prompt}
-
-GENERATED EMAIL: {generated_email}
-
-CRITICAL INSTRUCTIONS:
-1. Compare dates EXACTLY - if request says "17-18 November" but email says "December 10", that's WRONG
-2. Check recipient EXACTLY - if request says "HR" but email says "Mr. Smith", that's WRONG
-3. Check context - if it's a sick leave request, it should REQUEST leave, not say "I have taken"
-4. Check tense - requesting future leave should use future/present tense, not past tense
-5. BE VERY STRICT - any mismatch in dates, recipients, or context = LOW SCORE
-
-Score each criterion 0-10 (be harsh on errors):
-
-1. COMPLETENESS: Are ALL specific details from request included correctly?
-   - Dates must match EXACTLY (check day, month, year)
-   - Recipient must match (HR vs manager vs specific person)
-   - All mentioned items must be present (documentation, reason, etc.)
-   
-2. STRUCTURE: Proper email format?
-   - Subject line
-   - Greeting to correct recipient
-   - Body with clear request
-   - Professional closing
-   
-3. ACCURACY: Does content match request?
-   - Dates are EXACTLY as requested (not different dates)
-   - Recipient is EXACTLY as requested
-   - Context matches (sick leave vs vacation vs job posting, etc.)
-   
-4. TONE: Professional and appropriate?
-   - Not too casual or too formal
-   - Appropriate for the situation
-   
-5. CLARITY: Clear and understandable?
-   - No contradictions
-   - Tense consistency
-   - Logical flow
-
-SCORING RULES:
-- Wrong dates = automatic 0-2 for completeness and accuracy
-- Wrong recipient = automatic 0-3 for completeness
-- Wrong context (e.g., job posting instead of leave request) = automatic 0-2 for accuracy
-- Past tense when should be requesting = -2 points from clarity
-
-Return ONLY this JSON structure (no markdown, no backticks):
-{{
-    "completeness": <0-10>,
-    "structure": <0-10>,
-    "accuracy": <0-10>,
-    "tone": <0-10>,
-    "clarity": <0-10>,
-    "overall_score": <average of above 5>,
-    "feedback": "<detailed explanation of issues found>",
-    "critical_errors": ["list any date mismatches, recipient errors, context errors"],
-    "missing_elements": ["list missing details from request"]
-}}
+        date_check = self.check_date_match(prompt, generated_email)
+        if not date_check["passed"] and self._dates_absent(date_check["missing_dates"], generated_email):
+            max_score = self._max_score_with_issues(len(date_check["issues"]))
+            if max_score < self.threshold:
+                logger.info("Date issues cap score at %.1f < threshold %s, skipping LLM evaluation", max_score, self.threshold)
+                return self._deterministic_failure(date_check["issues"], max_score)
+        
+        # Only the per-request part is sent; the rubric lives in the system instruction
+        eval_prompt = f"""USER'S REQUEST: {prompt}
 
-BE STRICT. If dates don't match, score must be low."""
-        logger.debug(f"Evaluation prompt length: {len(eval_prompt)} chars")
+GENERATED EMAIL: {generated_email}"""
+        logger.debug("Evaluation prompt length: %s chars", len(eval_prompt))
+        
+        # The LLM evaluation does not depend on the programmatic checks (they only
+        # adjust the score afterwards), so start it first and run the checks meanwhile
+        logger.info("Calling Gemini API for LLM evaluation...")
+        llm_future = _LLM_CALL_EXECUTOR.submit(
+            self._generate_json_streaming,
+            self.eval_model,
+            eval_prompt,
+            _EVAL_GENERATION_CONFIG
+        )
+        
+        prog_checks = self.programmatic_checks(prompt, generated_email, date_check=date_check)
+        
+        if not prog_checks["passed"] and logger.isEnabledFor(logging.WARNING):
+            logger.warning("Programmatic checks failed:")
+            for issue in prog_checks["issues"]:
+                logger.warning("  - %s", issue)
 
         try:
-            logger.info("Calling Gemini API for LLM evaluation...")
-            response = self.model.generate_content(eval_prompt)
-            result = response.text.strip()
-            logger.debug(f"Raw response length: {len(result)} chars")
+            result = llm_future.result().strip()
+            logger.debug("Raw response length: %s chars", len(result))
             
-            # Use shared JSON parser utility
+            # Structured output parses on the parser's direct fast path; the repair
+            # strategies remain only as a safety net
             evaluation = parse_json_response(result, "evaluation")
             if not evaluation:
                 raise ValueError("Failed to parse evaluation JSON")
             
             llm_score = evaluation.get("overall_score", 0)
-            logger.debug(f"LLM overall score: {llm_score:.1f}")
+            logger.debug("LLM overall score: %.1f", llm_score)
             
             # Apply programmatic penalty
             final_score = max(0, llm_score - prog_checks["penalty"])
-            logger.debug(f"Score after penalty: {final_score:.1f}")
+            logger.debug("Score after penalty: %.1f", final_score)
             
             # If programmatic checks found critical issues, cap score
             if prog_checks["num_critical_issues"] > 0:
-                logger.warning(f"Critical issues found, capping score at {EVALUATOR_CRITICAL_ISSUE_SCORE_CAP}")
+                logger.warning("Critical issues found, capping score at %s", EVALUATOR_CRITICAL_ISSUE_SCORE_CAP)
                 final_score = min(final_score, EVALUATOR_CRITICAL_ISSUE_SCORE_CAP)
             
             passed = final_score >= self.threshold
@@ -355,11 +555,11 @@ BE STRICT. If dates don't match, score must be low."""
             if prog_checks["issues"]:
                 combined_feedback = "CRITICAL ISSUES: " + "; ".join(prog_checks["issues"]) + ". " + combined_feedback
             
-            logger.info(f"Evaluation complete: LLM Score={llm_score:.1f}, Penalty={prog_checks['penalty']:.1f}, Final Score={final_score:.1f}, Passed={passed}")
+            logger.info("Evaluation complete: LLM Score=%.1f, Penalty=%.1f, Final Score=%.1f, Passed=%s", llm_score, prog_checks['penalty'], final_score, passed)
             if evaluation.get("critical_errors"):
-                logger.warning(f"Critical errors: {evaluation['critical_errors']}")
+                logger.warning("Critical errors: %s", evaluation['critical_errors'])
             
-            return {
+            evaluation_result = {
                 "score": final_score,
                 "llm_score": llm_score,
                 "penalty": prog_checks["penalty"],
@@ -375,9 +575,12 @@ BE STRICT. If dates don't match, score must be low."""
                 "critical_errors": evaluation.get("critical_errors", []) + prog_checks["issues"],
                 "missing_elements": evaluation.get("missing_elements", [])
             }
+            # Only successful LLM evaluations are cached; fallbacks get retried next time
+            self._cache_put(cache_key, evaluation_result)
+            return evaluation_result
             
         except Exception as e:
-            logger.error(f"Evaluation failed: {e}", exc_info=True)
+            logger.error("Evaluation failed: %s", e, exc_info=True)
             
             # If LLM fails, use programmatic checks only
             if not prog_checks["passed"]:
@@ -392,4 +595,4 @@ BE STRICT. If dates don't match, score must be low."""
                 }
             
             logger.warning("LLM evaluation failed, no programmatic issues found, returning default pass")
-            return {"score": EVALUATOR_DEFAULT_SCORE, "passed": True, "feedback": f"Error: {e}"}
\ No newline at end of file
+            return {"score": EVALUATOR_DEFAULT_SCORE, "passed": True, "feedback": f"Error: {e}"}
@@ -1,10 +1,3 @@
-"""
-Poem Expert LangGraph Agent
-Placeholder for future LangGraph agent implementation.
-"""
-# TODO: Implement LangGraph agent for poetry generation
-# This will use Gemini via LangChain to generate creative poetry
-
 """
 Poem Expert LangGraph Agent
 
@@ -133,6 +126,9 @@ class PoemExpertAgent:
             logger.warning("⚠️ No GEMINI_API_KEY found in .env")
             self.llm = None
         
+        # The system prompt never changes, so build its message once
+        self._system_message = SystemMessage(content=POEM_SYSTEM_PROMPT)
+        
         # Build the LangGraph workflow
         self.workflow = self._build_workflow()
         logger.info("✅ Poem Expert Agent ready!")
@@ -304,7 +300,7 @@ class PoemExpertAgent:
             
             # Create messages for Gemini
             messages = [
-                SystemMessage(content=POEM_SYSTEM_PROMPT),
+                self._system_message,
                 HumanMessage(content=user_prompt)
             ]
             
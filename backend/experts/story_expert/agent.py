@@ -80,6 +80,9 @@ class StoryExpertAgent:
             logger.warning("⚠️ No GEMINI_API_KEY. LLM disabled.")
             self.llm = None
         
+        # The system prompt never changes, so build its message once
+        self._system_message = SystemMessage(content=STORY_SYSTEM_PROMPT)
+        
         # Build LangGraph workflow
         self.workflow = self._build_workflow()
         logger.info("✅ Story Expert Agent initialized")
@@ -259,7 +262,7 @@ THEMES: {', '.join(extracted_context.get('themes', []))}"""
             
             # Generate story
             messages = [
-                SystemMessage(content=STORY_SYSTEM_PROMPT),
+                self._system_message,
                 HumanMessage(content=user_prompt)
             ]
             
@@ -3,14 +3,38 @@ Context Extractor - Extracts story requirements from user prompts
 """
 import os
 import logging
-import json
+import re
 from typing import Dict, Any, Optional
 import google.generativeai as genai
+from utils.json_parser import parse_json_robust
+from utils.fast_regex import compile_pattern
 from ..prompts import CONTEXT_EXTRACTION_PROMPT
 
 logger = logging.getLogger(__name__)
 
 
+def _keyword_pattern(keywords):
+    """Compile a case-insensitive substring alternation over keywords (re2 when available)."""
+    return compile_pattern("|".join(re.escape(kw) for kw in keywords), ignore_case=True)
+
+
+# Fallback keyword tables, checked in order (first match wins). Matching runs
+# case-insensitively on the original prompt, so no lowercased copy is needed.
+_GENRE_PATTERNS = [
+    ("fantasy", _keyword_pattern(["fantasy", "magic", "wizard", "dragon", "elf", "kingdom"])),
+    ("sci-fi", _keyword_pattern(["sci-fi", "science fiction", "space", "alien", "robot", "future", "spaceship"])),
+    ("romance", _keyword_pattern(["romance", "love", "relationship", "couple", "dating"])),
+    ("mystery", _keyword_pattern(["mystery", "detective", "crime", "murder", "clue", "investigate"])),
+    ("horror", _keyword_pattern(["horror", "scary", "haunted", "ghost", "terror", "nightmare"])),
+    ("adventure", _keyword_pattern(["adventure", "quest", "journey", "treasure", "explore"])),
+]
+_TONE_PATTERNS = [
+    ("dark", _keyword_pattern(["dark", "grim", "serious"])),
+    ("humorous", _keyword_pattern(["funny", "humorous", "comedy"])),
+    ("light", _keyword_pattern(["light", "cheerful", "uplifting"])),
+]
+
+
 class ContextExtractor:
     """Extracts story context and requirements from user prompts."""
     
@@ -50,13 +74,8 @@ class ContextExtractor:
             response = self.model.generate_content(extraction_prompt)
             result_text = response.text.strip()
             
-            # Remove markdown code blocks
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            extracted_data = json.loads(result_text)
+            # Handles code fences; repair strategies only run if the plain parse fails
+            extracted_data = parse_json_robust(result_text)
             
             logger.info(f"✅ Context extracted: Genre={extracted_data.get('genre')}, Tone={extracted_data.get('tone')}")
             return extracted_data
@@ -69,32 +88,11 @@ class ContextExtractor:
         """Fallback extraction using keyword matching."""
         logger.info("🔄 Using fallback context extraction")
         
-        prompt_lower = prompt.lower()
-        
         # Genre detection
-        genre_keywords = {
-            "fantasy": ["fantasy", "magic", "wizard", "dragon", "elf", "kingdom"],
-            "sci-fi": ["sci-fi", "science fiction", "space", "alien", "robot", "future", "spaceship"],
-            "romance": ["romance", "love", "relationship", "couple", "dating"],
-            "mystery": ["mystery", "detective", "crime", "murder", "clue", "investigate"],
-            "horror": ["horror", "scary", "haunted", "ghost", "terror", "nightmare"],
-            "adventure": ["adventure", "quest", "journey", "treasure", "explore"]
-        }
-        
-        genre = "general"
-        for g, keywords in genre_keywords.items():
-            if any(kw in prompt_lower for kw in keywords):
-                genre = g
-                break
+        genre = next((g for g, pattern in _GENRE_PATTERNS if pattern.search(prompt)), "general")
         
         # Tone detection
-        tone = "creative"
-        if any(word in prompt_lower for word in ["dark", "grim", "serious"]):
-            tone = "dark"
-        elif any(word in prompt_lower for word in ["funny", "humorous", "comedy"]):
-            tone = "humorous"
-        elif any(word in prompt_lower for word in ["light", "cheerful", "uplifting"]):
-            tone = "light"
+        tone = next((t for t, pattern in _TONE_PATTERNS if pattern.search(prompt)), "creative")
         
         return {
             "story_type": "short_story",
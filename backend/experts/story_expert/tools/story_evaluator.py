@@ -3,9 +3,9 @@ Story Evaluator - Evaluates story quality
 """
 import os
 import logging
-import json
 from typing import Dict, Any
 import google.generativeai as genai
+from utils.json_parser import parse_json_robust
 from ..prompts import STORY_EVALUATION_PROMPT
 
 logger = logging.getLogger(__name__)
@@ -62,13 +62,8 @@ class StoryEvaluator:
             response = self.model.generate_content(eval_prompt)
             result_text = response.text.strip()
             
-            # Remove markdown
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            evaluation = json.loads(result_text)
+            # Handles code fences; repair strategies only run if the plain parse fails
+            evaluation = parse_json_robust(result_text)
             
             llm_score = evaluation.get("overall_score", 0)
             final_score = max(0, llm_score - prog_checks["penalty"])
@@ -6,6 +6,7 @@ import logging
 import json
 from typing import Dict, Any
 import google.generativeai as genai
+from utils.json_parser import parse_json_robust
 from ..prompts import STORY_PLANNING_PROMPT
 
 logger = logging.getLogger(__name__)
@@ -54,13 +55,8 @@ class StoryPlanner:
             response = self.model.generate_content(planning_prompt)
             result_text = response.text.strip()
             
-            # Remove markdown
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            plan_data = json.loads(result_text)
+            # Handles code fences; repair strategies only run if the plain parse fails
+            plan_data = parse_json_robust(result_text)
             
             logger.info("✅ Story plan created successfully")
             return plan_data
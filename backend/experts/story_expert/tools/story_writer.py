@@ -2,9 +2,13 @@
 Story Writer - Generates actual story text (kept minimal, main generation in agent)
 """
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Whitespace (other than the newline itself) around each line break
+_LINE_EDGE_WS_RE = re.compile(r'[^\S\n]*\n[^\S\n]*')
+
 
 class StoryWriter:
     """Handles story writing utilities."""
@@ -18,8 +22,9 @@ class StoryWriter:
         # Remove asterisks used for Markdown bold/italics (e.g., *feeling* -> feeling)
         story_text = story_text.replace("*", "")
 
-        # Remove excessive whitespace
-        story_text = "\n".join(line.strip() for line in story_text.split("\n"))
+        # Remove excessive whitespace (strips every line in one pass; the final
+        # strip() below handles the start of the first and end of the last line)
+        story_text = _LINE_EDGE_WS_RE.sub("\n", story_text)
         
         # Ensure proper paragraph spacing
         story_text = story_text.replace("\n\n\n", "\n\n")
@@ -28,12 +33,14 @@ class StoryWriter:
     
     def extract_title(self, story_text: str) -> tuple:
         """Extract title if present in story."""
-        lines = story_text.split("\n")
+        # Only the first line matters, so split it off without splitting
+        # (and re-joining) the whole story
+        first_line, _, rest = story_text.partition("\n")
         
         # Check if first line looks like a title
-        if lines and len(lines[0]) < 100 and not lines[0].endswith("."):
-            title = lines[0].strip().strip("#").strip()
-            body = "\n".join(lines[1:]).strip()
+        if len(first_line) < 100 and not first_line.endswith("."):
+            title = first_line.strip().strip("#").strip()
+            body = rest.strip()
             return title, body
         
         return None, story_text
\ No newline at end of file
@@ -3,8 +3,10 @@ Main FastAPI application for Multi-Topic Text Generator
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
+import json
 import logging
 import os
 from dotenv import load_dotenv
@@ -15,7 +17,7 @@ load_dotenv()
 # Import LangGraph agents
 from experts.story_expert.agent import StoryExpertAgent
 from experts.poem_expert.agent import PoemExpertAgent
-from experts.email_expert.agent import EmailExpertAgent
+from experts.email_expert.agent import get_agent as get_email_agent
 from routers.text_router import TextRouter
 
 # Configure logging
@@ -70,7 +72,7 @@ except Exception as e:
 
 try:
     logger.info("   Initializing Email Expert...")
-    email_expert_agent = EmailExpertAgent()
+    email_expert_agent = get_email_agent()
     logger.info("   ✅ Email Expert initialized")
 except Exception as e:
     logger.error(f"   ❌ Email Expert initialization failed: {e}")
@@ -139,6 +141,7 @@ async def root():
         "endpoints": {
             "/generate": "POST - Generate text using automatic expert routing",
             "/generate/{expert_name}": "POST - Generate text using a specific expert",
+            "/generate/email/stream": "POST - Stream an email as Server-Sent Events",
             "/experts": "GET - List all available experts",
             "/router/info": "GET - Get router configuration info",
             "/health": "GET - Health check"
@@ -211,7 +214,7 @@ async def generate_text(request: GenerationRequest):
 
         # Route and generate
         logger.info("🔄 Routing request to expert...")
-        result = text_router.route_and_generate(
+        result = await text_router.aroute_and_generate(
             prompt=request.prompt,
             max_length=request.max_length,
             temperature=request.temperature,
@@ -280,7 +283,7 @@ async def generate_with_expert(expert_name: str, request: GenerationRequest):
 
         # Generate with forced expert
         logger.info(f"🔄 Forcing generation with {expert_name} expert...")
-        result = text_router.route_and_generate(
+        result = await text_router.aroute_and_generate(
             prompt=request.prompt,
             max_length=request.max_length,
             temperature=request.temperature,
@@ -308,6 +311,35 @@ async def generate_with_expert(expert_name: str, request: GenerationRequest):
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
 
+@app.post("/generate/email/stream")
+async def stream_email(request: GenerationRequest):
+    """
+    Stream an email from the Email expert as Server-Sent Events.
+
+    Each event is a JSON object: "token" events carry text as it is generated
+    (a new draft_id means the previous draft was discarded for a regeneration),
+    and a closing "final" event carries the finished email.
+    """
+    if email_expert_agent is None:
+        raise HTTPException(status_code=503, detail="Email expert is not available")
+
+    logger.info(f"📥 Received streaming email request")
+    logger.info(f"   Prompt: {request.prompt[:100]}...")
+
+    enhanced_query = await text_router.query_enhancer.enhance_async(request.prompt, expert_type="email")
+
+    async def event_stream():
+        async for event in email_expert_agent.astream(
+            prompt=request.prompt,
+            enhanced_query=enhanced_query,
+            max_length=request.max_length,
+            temperature=request.temperature
+        ):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 # ==================== STARTUP/SHUTDOWN ====================
 
 @app.on_event("startup")
@@ -1,16 +1,45 @@
 """
 Text Router - Hybrid routing system for multiple experts
 """
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
+import asyncio
 import logging
 import os
-from dotenv import load_dotenv
+import re
 from services.query_enhancer import QueryEnhancer
 
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
+# Leading labels the LLM sometimes puts before a routing explanation. Anchored
+# so the words are left alone wherever they recur inside the explanation.
+_REASON_PREFIX_RE = re.compile(r'^(?:Explanation:\s*)?(?:Reason:\s*)?')
+
+# Expert descriptions used in routing reasons (fast route, matched-keyword
+# reason, no-match reason and keyword-scoring fallback), built once at import
+_FAST_ROUTE_DESCRIPTIONS = {
+    "story": "creative narrative generation with character development and plot structure",
+    "poem": "poetic composition with various styles and verse forms",
+    "email": "professional communication with proper structure and formal tone"
+}
+
+_KEYWORD_REASON_DESCRIPTIONS = {
+    "story": "creative narrative generation with character development and plot structure",
+    "poem": "poetic composition with various styles like haiku, sonnet, or free verse",
+    "email": "professional communication with proper structure and formal tone"
+}
+
+_DEFAULT_REASON_DESCRIPTIONS = {
+    "story": "creative narratives, fiction, and storytelling",
+    "poem": "poetry, verses, and poetic compositions",
+    "email": "professional emails and formal communication"
+}
+
+_FALLBACK_ROUTE_DESCRIPTIONS = {
+    "story": "creative narratives, character development, and plot structure",
+    "poem": "poetry, verse composition, and poetic forms",
+    "email": "professional communication, formal writing, and business correspondence"
+}
+
 
 class TextRouter:
     """
@@ -19,6 +48,82 @@ class TextRouter:
     2. LLM-based routing for ambiguous cases
     """
 
+    # Keyword tables and patterns are class attributes: they are static, so
+    # they are built once at import and shared by every router instance
+
+    # High-confidence keywords for fast routing (obvious cases)
+    high_confidence_keywords = {
+        "story": [
+            "write a story", "tell me a story", "create a story",
+            "once upon a time", "story about", "short story",
+            "write me a tale", "narrative about"
+        ],
+        "poem": [
+            "write a poem", "compose a poem", "create a poem",
+            "write poetry", "haiku about", "sonnet about",
+            "poem about"
+        ],
+        "email": [
+            "write an email", "draft an email", "compose an email",
+            "email to", "write a letter", "professional email",
+            "sick leave", "vacation request", "leave request"
+        ]
+    }
+
+    # Comprehensive keyword lists for scoring
+    expert_keywords = {
+        "story": [
+            "story", "tale", "narrative", "fiction", "novel",
+            "adventure", "character", "plot", "once upon",
+            "chapter", "beginning", "ending", "short story",
+            "fantasy", "sci-fi", "science fiction", "mystery", "thriller",
+            "hero", "villain", "protagonist", "antagonist",
+            "magic", "quest", "journey", "legend", "fable",
+            "chronicles", "saga", "epic", "folklore",
+            "imaginary", "fictional", "storytelling", "robot", "dragon"
+        ],
+        "poem": [
+            "poem", "poetry", "verse", "rhyme", "haiku",
+            "sonnet", "stanza", "lyric", "ballad", "ode",
+            "limerick", "free verse", "poetic", "metaphor",
+            "romantic", "epic poem", "acrostic", "couplet",
+            "quatrain", "iambic", "rhythm", "rhyming"
+        ],
+        "email": [
+            "email", "mail", "letter", "message", "write", "send",
+            "compose", "draft", "correspondence",
+            "leave", "sick", "vacation", "absence", "time off",
+            "sick leave", "medical leave", "annual leave", "pto",
+            "day off", "days off", "absent", "unavailable",
+            "hr", "human resource", "human resources",
+            "manager", "boss", "supervisor", "director",
+            "company", "work", "office", "workplace",
+            "department", "team", "colleague", "employee",
+            "request", "application", "apply", "asking",
+            "inquiry", "proposal", "permission",
+            "meeting", "appointment", "schedule", "discuss",
+            "call", "conference", "zoom", "teams",
+            "professional", "formal", "business", "official",
+            "corporate", "executive",
+            "dear", "sincerely", "regards", "thank", "thanks",
+            "gratitude", "appreciate", "appreciation",
+            "follow up", "follow-up", "following up",
+            "apology", "apologize", "sorry",
+            "complaint", "concern", "issue", "problem",
+            "resignation", "resign", "quit", "leaving",
+            "invitation", "invite", "rsvp",
+            "confirmation", "confirm",
+            "reminder", "reminding"
+        ]
+    }
+
+    # One case-insensitive alternation per expert so the fast path scans
+    # the prompt once per expert instead of once per phrase
+    _high_confidence_patterns = {
+        expert: re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE)
+        for expert, keywords in high_confidence_keywords.items()
+    }
+
     def __init__(self, story_expert, poem_expert, email_expert):
         """Initialize router with expert instances."""
         # Store the instances passed from main.py
@@ -35,72 +140,6 @@ class TextRouter:
         self._llm = None
         self.use_llm_routing = True
 
-        # High-confidence keywords for fast routing (obvious cases)
-        self.high_confidence_keywords = {
-            "story": [
-                "write a story", "tell me a story", "create a story",
-                "once upon a time", "story about", "short story",
-                "write me a tale", "narrative about"
-            ],
-            "poem": [
-                "write a poem", "compose a poem", "create a poem",
-                "write poetry", "haiku about", "sonnet about",
-                "poem about"
-            ],
-            "email": [
-                "write an email", "draft an email", "compose an email",
-                "email to", "write a letter", "professional email",
-                "sick leave", "vacation request", "leave request"
-            ]
-        }
-
-        # Comprehensive keyword lists for scoring
-        self.expert_keywords = {
-            "story": [
-                "story", "tale", "narrative", "fiction", "novel",
-                "adventure", "character", "plot", "once upon",
-                "chapter", "beginning", "ending", "short story",
-                "fantasy", "sci-fi", "science fiction", "mystery", "thriller",
-                "hero", "villain", "protagonist", "antagonist",
-                "magic", "quest", "journey", "legend", "fable",
-                "chronicles", "saga", "epic", "folklore",
-                "imaginary", "fictional", "storytelling", "robot", "dragon"
-            ],
-            "poem": [
-                "poem", "poetry", "verse", "rhyme", "haiku",
-                "sonnet", "stanza", "lyric", "ballad", "ode",
-                "limerick", "free verse", "poetic", "metaphor",
-                "romantic", "epic poem", "acrostic", "couplet",
-                "quatrain", "iambic", "rhythm", "rhyming"
-            ],
-            "email": [
-                "email", "mail", "letter", "message", "write", "send",
-                "compose", "draft", "correspondence",
-                "leave", "sick", "vacation", "absence", "time off",
-                "sick leave", "medical leave", "annual leave", "pto",
-                "day off", "days off", "absent", "unavailable",
-                "hr", "human resource", "human resources",
-                "manager", "boss", "supervisor", "director",
-                "company", "work", "office", "workplace",
-                "department", "team", "colleague", "employee",
-                "request", "application", "apply", "asking",
-                "inquiry", "proposal", "permission",
-                "meeting", "appointment", "schedule", "discuss",
-                "call", "conference", "zoom", "teams",
-                "professional", "formal", "business", "official",
-                "corporate", "executive",
-                "dear", "sincerely", "regards", "thank", "thanks",
-                "gratitude", "appreciate", "appreciation",
-                "follow up", "follow-up", "following up",
-                "apology", "apologize", "sorry",
-                "complaint", "concern", "issue", "problem",
-                "resignation", "resign", "quit", "leaving",
-                "invitation", "invite", "rsvp",
-                "confirmation", "confirm",
-                "reminder", "reminding"
-            ]
-        }
-
         # Log active experts to verify loading
         active = [k for k, v in self.experts.items() if v is not None]
         logger.info(f"✅ Hybrid TextRouter initialized. Active experts: {active}")
@@ -132,25 +171,19 @@ class TextRouter:
 
     def fast_keyword_check(self, prompt: str) -> Optional[tuple]:
         """Fast pre-filter using high-confidence keywords."""
-        prompt_lower = prompt.lower()
-        for expert, keywords in self.high_confidence_keywords.items():
-            for keyword in keywords:
-                if keyword in prompt_lower:
-                    # Find the context around the keyword for a more descriptive reason
-                    keyword_index = prompt_lower.find(keyword)
-                    context_start = max(0, keyword_index - 30)
-                    context_end = min(len(prompt), keyword_index + len(keyword) + 30)
-                    context = prompt[context_start:context_end].strip()
-                    
-                    expert_descriptions = {
-                        "story": "creative narrative generation with character development and plot structure",
-                        "poem": "poetic composition with various styles and verse forms",
-                        "email": "professional communication with proper structure and formal tone"
-                    }
-                    
-                    reason = f"High-confidence keyword match detected: The phrase '{keyword}' in your request ('{context}...') clearly indicates you need {expert_descriptions.get(expert, expert)}. The {expert.capitalize()} expert is specifically designed to handle this type of content."
-                    logger.info(f"⚡ Fast route: '{keyword}' → {expert.upper()} expert")
-                    return expert, 0.95, reason
+        for expert, pattern in self._high_confidence_patterns.items():
+            match = pattern.search(prompt)
+            if match:
+                keyword = match.group(0).lower()
+                # Find the context around the keyword for a more descriptive reason
+                keyword_index = match.start()
+                context_start = max(0, keyword_index - 30)
+                context_end = min(len(prompt), match.end() + 30)
+                context = prompt[context_start:context_end].strip()
+
+                reason = f"High-confidence keyword match detected: The phrase '{keyword}' in your request ('{context}...') clearly indicates you need {_FAST_ROUTE_DESCRIPTIONS.get(expert, expert)}. The {expert.capitalize()} expert is specifically designed to handle this type of content."
+                logger.info(f"⚡ Fast route: '{keyword}' → {expert.upper()} expert")
+                return expert, 0.95, reason
         return None
 
     def llm_route(self, prompt: str) -> tuple:
@@ -208,11 +241,8 @@ Response (just the explanation, no labels):"""
             response = self.llm.invoke(reason_prompt)
             reason = response.content.strip()
             
-            # Clean up the reason
-            if reason.startswith("Explanation:"):
-                reason = reason.replace("Explanation:", "").strip()
-            if reason.startswith("Reason:"):
-                reason = reason.replace("Reason:", "").strip()
+            # Clean up the reason: strip only the leading label(s)
+            reason = _REASON_PREFIX_RE.sub("", reason, count=1)
             
             return reason
             
@@ -237,21 +267,9 @@ Response (just the explanation, no labels):"""
             if len(matched_keywords) > 5:
                 keyword_list += f" and {len(matched_keywords) - 5} more"
             
-            expert_descriptions = {
-                "story": "creative narrative generation with character development and plot structure",
-                "poem": "poetic composition with various styles like haiku, sonnet, or free verse",
-                "email": "professional communication with proper structure and formal tone"
-            }
-            
-            return f"The request contains {expert}-related terms ({keyword_list}), indicating the need for {expert_descriptions.get(expert, expert)}. The {expert.capitalize()} expert specializes in this type of content generation."
-        
-        expert_descriptions = {
-            "story": "creative narratives, fiction, and storytelling",
-            "poem": "poetry, verses, and poetic compositions",
-            "email": "professional emails and formal communication"
-        }
+            return f"The request contains {expert}-related terms ({keyword_list}), indicating the need for {_KEYWORD_REASON_DESCRIPTIONS.get(expert, expert)}. The {expert.capitalize()} expert specializes in this type of content generation."
         
-        return f"Based on the request analysis, the {expert.capitalize()} expert is selected because the content requires {expert_descriptions.get(expert, expert)} capabilities."
+        return f"Based on the request analysis, the {expert.capitalize()} expert is selected because the content requires {_DEFAULT_REASON_DESCRIPTIONS.get(expert, expert)} capabilities."
 
     def _fallback_keyword_route(self, prompt: str) -> tuple:
         """Fallback routing using keyword scoring."""
@@ -273,21 +291,15 @@ Response (just the explanation, no labels):"""
             if keyword in prompt_lower:
                 matched_keywords.append(keyword)
         
-        expert_descriptions = {
-            "story": "creative narratives, character development, and plot structure",
-            "poem": "poetry, verse composition, and poetic forms",
-            "email": "professional communication, formal writing, and business correspondence"
-        }
-        
         if matched_keywords:
             top_matches = matched_keywords[:5]  # Show top 5 matches
             keyword_list = ', '.join([f'"{kw}"' for kw in top_matches])
             if len(matched_keywords) > 5:
                 keyword_list += f", and {len(matched_keywords) - 5} more related terms"
             
-            reason = f"Keyword analysis identified {scores[best_expert]} matching terms in your request, including {keyword_list}. These terms strongly indicate the need for {expert_descriptions.get(best_expert, best_expert)} capabilities, which the {best_expert.capitalize()} expert specializes in."
+            reason = f"Keyword analysis identified {scores[best_expert]} matching terms in your request, including {keyword_list}. These terms strongly indicate the need for {_FALLBACK_ROUTE_DESCRIPTIONS.get(best_expert, best_expert)} capabilities, which the {best_expert.capitalize()} expert specializes in."
         else:
-            reason = f"After analyzing keyword patterns, the {best_expert.capitalize()} expert was selected as it best matches the content type implied by your request. This expert handles {expert_descriptions.get(best_expert, best_expert)}."
+            reason = f"After analyzing keyword patterns, the {best_expert.capitalize()} expert was selected as it best matches the content type implied by your request. This expert handles {_FALLBACK_ROUTE_DESCRIPTIONS.get(best_expert, best_expert)}."
 
         logger.info(f"🔍 Keyword route: {best_expert.upper()} expert (confidence: {confidence:.2f})")
         logger.debug(f"   Keyword scores: {scores}")
@@ -360,11 +372,69 @@ Response (just the explanation, no labels):"""
         logger.debug(f"   max_length: {max_length}, temperature: {temperature}, force_expert: {force_expert}")
 
         # 1. Select Expert
+        routing = self._select_available_expert(prompt, force_expert)
+        expert_name = routing[0]
+
+        # 2. Generate content using selected expert
+        try:
+            generated_text, enhanced_query = self._generate_with_expert(
+                expert_name, prompt, max_length, temperature
+            )
+        except Exception as e:
+            logger.error(f"❌ Generation failed with {expert_name} expert: {e}", exc_info=True)
+            raise
+
+        # 3. Return results
+        return self._build_result(prompt, routing, generated_text, enhanced_query)
+
+    async def aroute_and_generate(
+        self,
+        prompt: str,
+        max_length: Optional[int] = None,
+        temperature: Optional[float] = None,
+        force_expert: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of route_and_generate() for the API endpoints.
+
+        The Email expert runs through its agenerate(), so its workflows are
+        bounded by EMAIL_MAX_CONCURRENCY and do not block the event loop. The
+        other experts only have a blocking generate() and run in a worker thread.
+        """
+        logger.info(f"🔄 TextRouter.aroute_and_generate() called")
+        logger.info(f"   Prompt: {prompt[:100]}...")
+
+        # Routing may call the LLM, so keep it off the event loop
+        routing = await asyncio.to_thread(self._select_available_expert, prompt, force_expert)
+        expert_name = routing[0]
+
+        try:
+            if expert_name == "email":
+                logger.info("📧 Invoking Email Expert (async)...")
+                enhanced_query = await self.query_enhancer.enhance_async(prompt, expert_type="email")
+                generated_text = await self.experts["email"].agenerate(
+                    prompt=prompt,
+                    enhanced_query=enhanced_query,
+                    max_length=max_length,
+                    temperature=temperature
+                )
+                logger.info(f"✅ Generation successful: {len(generated_text)} chars")
+            else:
+                generated_text, enhanced_query = await asyncio.to_thread(
+                    self._generate_with_expert, expert_name, prompt, max_length, temperature
+                )
+        except Exception as e:
+            logger.error(f"❌ Generation failed with {expert_name} expert: {e}", exc_info=True)
+            raise
+
+        return self._build_result(prompt, routing, generated_text, enhanced_query)
+
+    def _select_available_expert(self, prompt: str, force_expert: Optional[str]) -> Tuple[str, float, str, str]:
+        """Select an expert and check it is loaded; returns select_expert()'s tuple."""
         expert_name, confidence, routing_method, routing_reason = self.select_expert(prompt, force_expert)
-        expert = self.experts[expert_name]
 
         # Check if expert is available
-        if expert is None:
+        if self.experts[expert_name] is None:
             logger.error(f"❌ Expert '{expert_name}' is not available (not loaded)")
             raise ValueError(
                 f"Expert '{expert_name}' is not yet implemented or failed to load. "
@@ -373,59 +443,72 @@ Response (just the explanation, no labels):"""
 
         logger.info(f"   ✅ Selected expert: {expert_name.upper()}")
         logger.info(f"   Confidence: {confidence:.1%}, Method: {routing_method}")
+        return expert_name, confidence, routing_method, routing_reason
 
-        # 2. Generate content using selected expert
+    def _generate_with_expert(
+        self,
+        expert_name: str,
+        prompt: str,
+        max_length: Optional[int],
+        temperature: Optional[float]
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Enhance the query and generate with the named expert; returns (text, enhanced_query)."""
+        expert = self.experts[expert_name]
         generated_text = ""
         enhanced_query = None
 
-        try:
-            if expert_name == "email":
-                # Email-specific logic with query enhancement
-                logger.info("📧 Invoking Email Expert...")
-                enhanced_query = self.query_enhancer.enhance(prompt, expert_type="email")
-                logger.debug(f"   Enhanced query keys: {list(enhanced_query.keys())}")
-
-                generated_text = expert.generate(
-                    prompt=prompt,
-                    enhanced_query=enhanced_query,
-                    max_length=max_length,
-                    temperature=temperature
-                )
-
-            elif expert_name == "story":
-                # Story-specific logic with query enhancement
-                logger.info("📖 Invoking Story Expert...")
-                enhanced_query = self.query_enhancer.enhance(prompt, expert_type="story")
-                logger.debug(f"   Enhanced query keys: {list(enhanced_query.keys())}")
+        if expert_name == "email":
+            # Email-specific logic with query enhancement
+            logger.info("📧 Invoking Email Expert...")
+            enhanced_query = self.query_enhancer.enhance(prompt, expert_type="email")
+            logger.debug(f"   Enhanced query keys: {list(enhanced_query.keys())}")
+
+            generated_text = expert.generate(
+                prompt=prompt,
+                enhanced_query=enhanced_query,
+                max_length=max_length,
+                temperature=temperature
+            )
 
-                # ✅ Pass enhanced_query to story expert
-                generated_text = expert.generate(
-                    prompt=prompt,
-                    enhanced_query=enhanced_query,
-                    max_length=max_length,
-                    temperature=temperature
-                )
+        elif expert_name == "story":
+            # Story-specific logic with query enhancement
+            logger.info("📖 Invoking Story Expert...")
+            enhanced_query = self.query_enhancer.enhance(prompt, expert_type="story")
+            logger.debug(f"   Enhanced query keys: {list(enhanced_query.keys())}")
+
+            # ✅ Pass enhanced_query to story expert
+            generated_text = expert.generate(
+                prompt=prompt,
+                enhanced_query=enhanced_query,
+                max_length=max_length,
+                temperature=temperature
+            )
 
-            elif expert_name == "poem":
-                # Poem-specific logic (when implemented)
-                logger.info("✍️ Invoking Poem Expert...")
-                enhanced_query = self.query_enhancer.enhance(prompt, expert_type="poem")
+        elif expert_name == "poem":
+            # Poem-specific logic (when implemented)
+            logger.info("✍️ Invoking Poem Expert...")
+            enhanced_query = self.query_enhancer.enhance(prompt, expert_type="poem")
 
-                generated_text = expert.generate(
-                    prompt=prompt,
-                    enhanced_query=enhanced_query,
-                    max_length=max_length,
-                    temperature=temperature
-                )
-
-            logger.info(f"✅ Generation successful: {len(generated_text)} chars")
-            logger.debug(f"   Preview: {generated_text[:150]}...")
+            generated_text = expert.generate(
+                prompt=prompt,
+                enhanced_query=enhanced_query,
+                max_length=max_length,
+                temperature=temperature
+            )
 
-        except Exception as e:
-            logger.error(f"❌ Generation failed with {expert_name} expert: {e}", exc_info=True)
-            raise
+        logger.info(f"✅ Generation successful: {len(generated_text)} chars")
+        logger.debug(f"   Preview: {generated_text[:150]}...")
+        return generated_text, enhanced_query
 
-        # 3. Return results
+    def _build_result(
+        self,
+        prompt: str,
+        routing: Tuple[str, float, str, str],
+        generated_text: str,
+        enhanced_query: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Assemble the route_and_generate() response dict."""
+        expert_name, confidence, routing_method, routing_reason = routing
         return {
             "generated_text": generated_text,
             "expert": expert_name,
@@ -3,55 +3,166 @@ Shared Query Enhancer Service
 Enhances user queries using Gemini for all expert types (story, poem, email).
 """
 import os
+import copy
 import logging
 import re
 import json
-from typing import Dict, Any
+import threading
+import asyncio
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 import google.generativeai as genai
 from utils.json_parser import parse_json_robust
+from utils.fast_regex import compile_pattern
 
 logger = logging.getLogger(__name__)
 
+# Fallback email type keywords, checked in order (first match wins). Each
+# keyword must start at a word boundary ("ill" should not match "will").
+_EMAIL_TYPE_PATTERNS = [
+    (email_type, compile_pattern(r"\b(?:" + "|".join(map(re.escape, keywords)) + ")", ignore_case=True))
+    for email_type, keywords in (
+        ("sick_leave", ["sick", "ill", "medical"]),
+        ("vacation", ["vacation", "holiday", "time off"]),
+        ("meeting", ["meeting", "schedule"]),
+        ("thank_you", ["thank", "appreciate"]),
+    )
+]
+
+# Constant fields of the rule-based fallback enhancement for each expert type
+_FALLBACK_TEMPLATES = {
+    "email": {"tone": "formal", "recipient_type": "general"},
+    "story": {"genre": "general", "tone": "creative", "length_preference": "medium"},
+    "poem": {"poem_type": "free_verse", "tone": "expressive", "theme": "general", "rhyme_scheme": "free_verse"},
+    "general": {"content_type": "general", "tone": "neutral"},
+}
+
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
+
+# Sampling settings for enhancement calls, built once rather than per request
+_GENERATION_CONFIG = {
+    "temperature": 0.3,  # Lower temperature for more consistent JSON output
+    "top_p": 0.95,
+    "top_k": 40
+}
+
+
+def _object_schema(string_fields, list_fields) -> Dict[str, Any]:
+    """Build a Gemini response schema for an object of string and string-list fields."""
+    properties = {name: {"type": "string"} for name in string_fields}
+    properties.update({name: {"type": "array", "items": {"type": "string"}} for name in list_fields})
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+# Per-type generation configs requesting structured JSON output, so Gemini
+# returns a bare object matching the prompt's structure (no code fences or
+# stray prose for the parser to strip)
+_GENERATION_CONFIGS = {
+    expert_type: {
+        **_GENERATION_CONFIG,
+        "response_mime_type": "application/json",
+        "response_schema": _object_schema(string_fields, list_fields),
+    }
+    for expert_type, string_fields, list_fields in (
+        ("email", ["email_type", "tone", "recipient_type", "enhanced_instruction"],
+         ["key_points", "special_requirements"]),
+        ("story", ["genre", "tone", "length_preference", "enhanced_instruction"],
+         ["key_elements", "special_requirements"]),
+        ("poem", ["poem_type", "tone", "theme", "rhyme_scheme", "enhanced_instruction"],
+         ["special_requirements"]),
+        ("general", ["content_type", "tone", "enhanced_instruction"],
+         ["key_points", "special_requirements"]),
+    )
+}
+
+# Defaults filled into Gemini responses for each expert type
+# (enhanced_instruction defaults to the user query and is added separately)
+_ENHANCEMENT_DEFAULTS = {
+    "email": {
+        'email_type': 'general',
+        'tone': 'professional',
+        'key_points': [],
+        'recipient_type': 'general',
+        'special_requirements': [],
+    },
+    "story": {
+        'genre': 'general',
+        'tone': 'creative',
+        'key_elements': [],
+        'length_preference': 'medium',
+        'special_requirements': [],
+    },
+    "poem": {
+        'poem_type': 'free_verse',
+        'tone': 'expressive',
+        'theme': 'general',
+        'rhyme_scheme': 'free_verse',
+        'special_requirements': [],
+    },
+}
+
+
+@lru_cache(maxsize=4)
+def _resolve_model(api_key: str, preferred_model: Optional[str]) -> Tuple[Any, str]:
+    """
+    Configure Gemini and return the first model that can be constructed.
+    
+    Cached per (api_key, preferred_model) so additional QueryEnhancer instances
+    reuse the resolved model instead of repeating the configure/probe loop.
+    Failures raise and are therefore not cached.
+    """
+    genai.configure(api_key=api_key)
+    
+    model_names_to_try = [
+        preferred_model,  # Try user-specified model first
+        "gemini-2.5-flash",
+        "gemini-2.0-flash-exp",
+        "gemini-1.5-flash",
+        "gemini-pro"
+    ]
+    
+    for model_to_try in model_names_to_try:
+        if not model_to_try:
+            continue
+        try:
+            return genai.GenerativeModel(model_to_try), model_to_try
+        except (ValueError, AttributeError, RuntimeError) as e:
+            logger.debug("   Model %s failed: %.100s", model_to_try, e)
+            continue
+    
+    raise RuntimeError("No Gemini models available - all model attempts failed")
+
 
 class QueryEnhancer:
     """Enhances queries using Gemini for all expert types."""
     
     def __init__(self, api_key: str = None, model_name: str = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._prompt_builders = {
+            "email": self._create_email_prompt,
+            "story": self._create_story_prompt,
+            "poem": self._create_poem_prompt,
+        }
         model_name = model_name or os.getenv("QUERY_ENHANCER_MODEL", "gemini-2.5-flash")
         
+        # TTL cache of Gemini enhancements so repeated queries skip the network call
+        cache_size = int(os.getenv("QUERY_ENHANCER_CACHE_SIZE", "512"))  # 0 disables the cache
+        cache_ttl = float(os.getenv("QUERY_ENHANCER_CACHE_TTL", "600"))
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if TTLCache is not None and cache_size > 0 else None
+        self._cache_lock = threading.Lock()
+        if TTLCache is None:
+            logger.debug("   cachetools not installed - query enhancement cache disabled")
+        
         if self.api_key:
             try:
-                genai.configure(api_key=self.api_key)
-                
-                model_names_to_try = [
-                    model_name,  # Try user-specified model first
-                    "gemini-2.5-flash",
-                    "gemini-2.0-flash-exp",
-                    "gemini-1.5-flash",
-                    "gemini-pro"
-                ]
-                
-                self.model = None
-                self.model_name = None
-                for model_to_try in model_names_to_try:
-                    if not model_to_try:
-                        continue
-                    try:
-                        self.model = genai.GenerativeModel(model_to_try)
-                        self.model_name = model_to_try
-                        logger.info(f"✅ Query Enhancer initialized with Gemini: {model_to_try}")
-                        self.use_gemini = True
-                        break
-                    except (ValueError, AttributeError, RuntimeError) as e:
-                        logger.debug(f"   Model {model_to_try} failed: {str(e)[:100]}")
-                        continue
-                
-                if not self.model:
-                    raise RuntimeError("No Gemini models available - all model attempts failed")
-                    
+                self.model, self.model_name = _resolve_model(self.api_key, model_name)
+                logger.info("✅ Query Enhancer initialized with Gemini: %s", self.model_name)
+                self.use_gemini = True
             except (RuntimeError, ValueError, AttributeError) as e:
-                logger.warning(f"⚠️ Gemini init failed: {e}. Using fallback.")
+                logger.warning("⚠️ Gemini init failed: %s. Using fallback.", e)
                 self.model = None
                 self.model_name = None
                 self.use_gemini = False
@@ -72,93 +183,161 @@ class QueryEnhancer:
         Returns:
             Dictionary with enhanced query information
         """
-        logger.info(f"🔍 Enhancing query for {expert_type or 'auto'} expert: {user_query[:100]}...")
+        logger.info("🔍 Enhancing query for %s expert: %.100s...", expert_type or 'auto', user_query)
         
         if not self.use_gemini:
             return self._fallback_enhancement(user_query, expert_type)
         
-        # Create expert-specific enhancement prompt
-        if expert_type == "email":
-            enhancement_prompt = self._create_email_prompt(user_query)
-        elif expert_type == "story":
-            enhancement_prompt = self._create_story_prompt(user_query)
-        elif expert_type == "poem":
-            enhancement_prompt = self._create_poem_prompt(user_query)
-        else:
-            # Generic prompt that works for all types
-            enhancement_prompt = self._create_generic_prompt(user_query)
+        cache_key = self._cache_key(user_query, expert_type)
+        cached = self._cached_enhancement(cache_key, user_query, expert_type)
+        if cached is not None:
+            return cached
+        
+        enhancement_prompt = self._build_enhancement_prompt(user_query, expert_type)
         
         try:
             # Generate content with Gemini
-            logger.debug(f"   Sending prompt to Gemini ({self.model_name})...")
+            logger.debug("   Sending prompt to Gemini (%s)...", self.model_name)
             response = self.model.generate_content(
                 enhancement_prompt,
-                generation_config={
-                    "temperature": 0.3,  # Lower temperature for more consistent JSON output
-                    "top_p": 0.95,
-                    "top_k": 40
-                }
+                generation_config=_GENERATION_CONFIGS.get(expert_type, _GENERATION_CONFIGS["general"])
             )
+            return self._process_response(response, user_query, expert_type, cache_key)
             
-            if not response or not hasattr(response, 'text'):
-                raise ValueError("Empty or invalid response from Gemini")
-                
-            result_text = response.text.strip()
-            logger.debug(f"   Received response ({len(result_text)} chars)")
-            
-            # Use robust JSON parser
-            logger.debug("🔧 Parsing JSON with robust parser...")
-            try:
-                enhanced_data = parse_json_robust(result_text)
-                logger.debug(f"   Successfully parsed JSON with keys: {list(enhanced_data.keys())}")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"❌ JSON parsing failed: {e}")
-                logger.debug(f"   Problematic JSON (first 500 chars): {result_text[:500]}")
-                # Try to extract any useful information before falling back
-                raise
+        except Exception as e:
+            logger.error("❌ Enhancement failed: %s", e, exc_info=True)
+            logger.warning("   Falling back to rule-based enhancement")
+            return self._fallback_enhancement(user_query, expert_type)
+    
+    async def enhance_async(self, user_query: str, expert_type: str = None) -> Dict[str, Any]:
+        """
+        Async variant of enhance() using the Gemini async client.
+        
+        Lets concurrent requests overlap their Gemini round trips instead of
+        blocking a thread each. Caching and fallbacks behave as in enhance().
+        """
+        logger.info("🔍 Enhancing query (async) for %s expert: %.100s...", expert_type or 'auto', user_query)
+        
+        if not self.use_gemini:
+            return self._fallback_enhancement(user_query, expert_type)
+        
+        cache_key = self._cache_key(user_query, expert_type)
+        cached = self._cached_enhancement(cache_key, user_query, expert_type)
+        if cached is not None:
+            return cached
+        
+        enhancement_prompt = self._build_enhancement_prompt(user_query, expert_type)
+        
+        try:
+            logger.debug("   Sending prompt to Gemini (%s, async)...", self.model_name)
+            response = await self.model.generate_content_async(
+                enhancement_prompt,
+                generation_config=_GENERATION_CONFIGS.get(expert_type, _GENERATION_CONFIGS["general"])
+            )
+            return self._process_response(response, user_query, expert_type, cache_key)
             
-            # Validate and enrich enhanced data
-            enhanced_data['original_query'] = user_query
-            enhanced_data['expert_type'] = expert_type or 'auto'
+        except Exception as e:
+            logger.error("❌ Enhancement failed: %s", e, exc_info=True)
+            logger.warning("   Falling back to rule-based enhancement")
+            return self._fallback_enhancement(user_query, expert_type)
+    
+    async def enhance_batch(self, user_queries: List[str], expert_type: str = None) -> List[Dict[str, Any]]:
+        """
+        Enhance several queries concurrently.
+        
+        Args:
+            user_queries: Queries to enhance
+            expert_type: Expert type applied to every query
             
-            # Ensure required fields exist with defaults
-            if expert_type == "email":
-                enhanced_data.setdefault('email_type', 'general')
-                enhanced_data.setdefault('tone', 'professional')
-                enhanced_data.setdefault('key_points', [])
-                enhanced_data.setdefault('recipient_type', 'general')
-                enhanced_data.setdefault('special_requirements', [])
-                enhanced_data.setdefault('enhanced_instruction', user_query)
-            elif expert_type == "story":
-                enhanced_data.setdefault('genre', 'general')
-                enhanced_data.setdefault('tone', 'creative')
-                enhanced_data.setdefault('key_elements', [])
-                enhanced_data.setdefault('length_preference', 'medium')
-                enhanced_data.setdefault('special_requirements', [])
-                enhanced_data.setdefault('enhanced_instruction', user_query)
-            elif expert_type == "poem":
-                enhanced_data.setdefault('poem_type', 'free_verse')
-                enhanced_data.setdefault('tone', 'expressive')
-                enhanced_data.setdefault('theme', 'general')
-                enhanced_data.setdefault('rhyme_scheme', 'free_verse')
-                enhanced_data.setdefault('special_requirements', [])
-                enhanced_data.setdefault('enhanced_instruction', user_query)
+        Returns:
+            Enhanced query dictionaries in the same order as user_queries
+        """
+        return list(await asyncio.gather(*(self.enhance_async(query, expert_type) for query in user_queries)))
+    
+    def _build_enhancement_prompt(self, user_query: str, expert_type: Optional[str]) -> str:
+        """Create expert-specific enhancement prompt (generic prompt works for all types)."""
+        build_prompt = self._prompt_builders.get(expert_type, self._create_generic_prompt)
+        return build_prompt(user_query)
+    
+    def _cached_enhancement(self, cache_key: Tuple[Optional[str], str], user_query: str,
+                            expert_type: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the cached enhancement for this request, or None on a miss."""
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("⚡ Query enhancement cache hit for %s expert", expert_type or 'auto')
+            cached['original_query'] = user_query
+        return cached
+    
+    def _process_response(self, response, user_query: str, expert_type: Optional[str],
+                          cache_key: Tuple[Optional[str], str]) -> Dict[str, Any]:
+        """Parse a Gemini enhancement response, fill defaults and cache the result."""
+        if not response or not hasattr(response, 'text'):
+            raise ValueError("Empty or invalid response from Gemini")
             
-            logger.info(f"✅ Enhanced query for {enhanced_data.get('expert_type', 'unknown')} expert")
+        result_text = response.text.strip()
+        logger.debug("   Received response (%d chars)", len(result_text))
+        
+        # Use robust JSON parser
+        logger.debug("🔧 Parsing JSON with robust parser...")
+        try:
+            enhanced_data = parse_json_robust(result_text)
+            logger.debug("   Successfully parsed JSON with keys: %s", list(enhanced_data))
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error("❌ JSON parsing failed: %s", e)
+            logger.debug("   Problematic JSON (first 500 chars): %.500s", result_text)
+            # Try to extract any useful information before falling back
+            raise
+        
+        # Validate and enrich enhanced data
+        enhanced_data['original_query'] = user_query
+        enhanced_data['expert_type'] = expert_type or 'auto'
+        
+        # Ensure required fields exist with defaults
+        defaults = _ENHANCEMENT_DEFAULTS.get(expert_type)
+        if defaults:
+            for key, value in defaults.items():
+                enhanced_data.setdefault(key, list(value) if isinstance(value, list) else value)
+            enhanced_data.setdefault('enhanced_instruction', user_query)
+        
+        logger.info("✅ Enhanced query for %s expert", enhanced_data.get('expert_type', 'unknown'))
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug("   Enhanced query structure:")
             if expert_type == "email":
-                logger.debug(f"     - email_type: {enhanced_data.get('email_type', 'N/A')}")
-                logger.debug(f"     - tone: {enhanced_data.get('tone', 'N/A')}")
-                logger.debug(f"     - recipient_type: {enhanced_data.get('recipient_type', 'N/A')}")
-                logger.debug(f"     - key_points: {enhanced_data.get('key_points', [])}")
-            logger.debug(f"     - special_requirements: {enhanced_data.get('special_requirements', [])}")
-            logger.debug(f"     - enhanced_instruction: {enhanced_data.get('enhanced_instruction', 'N/A')[:100]}...")
-            return enhanced_data
-            
-        except Exception as e:
-            logger.error(f"❌ Enhancement failed: {e}", exc_info=True)
-            logger.warning("   Falling back to rule-based enhancement")
-            return self._fallback_enhancement(user_query, expert_type)
+                logger.debug("     - email_type: %s", enhanced_data.get('email_type', 'N/A'))
+                logger.debug("     - tone: %s", enhanced_data.get('tone', 'N/A'))
+                logger.debug("     - recipient_type: %s", enhanced_data.get('recipient_type', 'N/A'))
+                logger.debug("     - key_points: %s", enhanced_data.get('key_points', []))
+            logger.debug("     - special_requirements: %s", enhanced_data.get('special_requirements', []))
+            logger.debug("     - enhanced_instruction: %.100s...", enhanced_data.get('enhanced_instruction', 'N/A'))
+        # Only Gemini results are cached; fallbacks get retried next time
+        self._cache_put(cache_key, enhanced_data)
+        return enhanced_data
+    
+    def _cache_key(self, user_query: str, expert_type: Optional[str]) -> Tuple[Optional[str], str]:
+        """
+        Build the enhancement cache key per expert type.
+        
+        The query is casefolded and its whitespace collapsed, so requests that
+        differ only in case or spacing share an entry while every name, date,
+        number and symbol (C++ vs C) still has to match.
+        """
+        return expert_type, " ".join(user_query.casefold().split())
+    
+    def _cache_get(self, key: Tuple[Optional[str], str]) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached enhancement, or None on a miss."""
+        if self._cache is None:
+            return None
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        return copy.deepcopy(cached) if cached is not None else None
+    
+    def _cache_put(self, key: Tuple[Optional[str], str], enhanced_data: Dict[str, Any]) -> None:
+        """Store a copy of an enhancement, without the caller-specific original query."""
+        if self._cache is None:
+            return
+        entry = {k: copy.deepcopy(v) for k, v in enhanced_data.items() if k != 'original_query'}
+        with self._cache_lock:
+            self._cache[key] = entry
     
     def _create_email_prompt(self, user_query: str) -> str:
         """Create enhancement prompt for email expert."""
@@ -286,59 +465,24 @@ JSON:"""
         """Fallback enhancement when Gemini is not available."""
         logger.warning("Using fallback enhancement")
         
-        query_lower = user_query.lower()
+        # Per-call fields; the constant fields come from _FALLBACK_TEMPLATES
+        query_fields = {
+            "special_requirements": [],
+            "enhanced_instruction": user_query,
+            "original_query": user_query,
+            "expert_type": expert_type or "auto"
+        }
         
         if expert_type == "email":
-            email_type = "general"
-            if any(word in query_lower for word in ["sick", "ill", "medical"]):
-                email_type = "sick_leave"
-            elif any(word in query_lower for word in ["vacation", "holiday", "time off"]):
-                email_type = "vacation"
-            elif any(word in query_lower for word in ["meeting", "schedule"]):
-                email_type = "meeting"
-            elif any(word in query_lower for word in ["thank", "appreciate"]):
-                email_type = "thank_you"
-            
-            return {
-                "email_type": email_type,
-                "tone": "formal",
-                "key_points": [user_query],
-                "recipient_type": "general",
-                "special_requirements": [],
-                "enhanced_instruction": user_query,
-                "original_query": user_query,
-                "expert_type": expert_type or "auto"
-            }
+            email_type = next(
+                (name for name, pattern in _EMAIL_TYPE_PATTERNS if pattern.search(user_query)),
+                "general"
+            )
+            return {**_FALLBACK_TEMPLATES["email"], "email_type": email_type, "key_points": [user_query], **query_fields}
         elif expert_type == "story":
-            return {
-                "genre": "general",
-                "tone": "creative",
-                "key_elements": [user_query],
-                "length_preference": "medium",
-                "special_requirements": [],
-                "enhanced_instruction": user_query,
-                "original_query": user_query,
-                "expert_type": expert_type or "auto"
-            }
+            return {**_FALLBACK_TEMPLATES["story"], "key_elements": [user_query], **query_fields}
         elif expert_type == "poem":
-            return {
-                "poem_type": "free_verse",
-                "tone": "expressive",
-                "theme": "general",
-                "rhyme_scheme": "free_verse",
-                "special_requirements": [],
-                "enhanced_instruction": user_query,
-                "original_query": user_query,
-                "expert_type": expert_type or "auto"
-            }
+            return {**_FALLBACK_TEMPLATES["poem"], **query_fields}
         else:
-            return {
-                "content_type": "general",
-                "tone": "neutral",
-                "key_points": [user_query],
-                "special_requirements": [],
-                "enhanced_instruction": user_query,
-                "original_query": user_query,
-                "expert_type": expert_type or "auto"
-            }
+            return {**_FALLBACK_TEMPLATES["general"], "key_points": [user_query], **query_fields}
 
@@ -0,0 +1,42 @@
+"""
+Fast Regex Utility
+Compiles patterns with google-re2 (linear-time DFA matching, no backtracking)
+when it is installed, falling back to the standard re module otherwise.
+"""
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+RE2_AVAILABLE = re2 is not None
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False):
+    """
+    Compile a regex pattern with the fastest available engine.
+    
+    Flags are passed inline because re2 does not accept re's flag constants.
+    Patterns that re2 cannot handle (backreferences, lookarounds) fall back to re.
+    
+    Args:
+        pattern: Regular expression pattern
+        ignore_case: Match case-insensitively
+        
+    Returns:
+        Compiled pattern object exposing search/findall/finditer
+    """
+    if ignore_case:
+        pattern = '(?i)' + pattern
+    
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except re2.error as e:
+            logger.debug("re2 could not compile pattern, using re: %s", e)
+    
+    return re.compile(pattern)
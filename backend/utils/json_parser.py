@@ -5,9 +5,33 @@ Handles malformed JSON from LLM responses with multiple fallback strategies.
 import json
 import re
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(text: str):
+    """Decode JSON with orjson when installed, falling back to the stdlib parser."""
+    if orjson is not None:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers are unaffected
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+# Repair patterns, compiled once at import instead of looked up per call
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_UNESCAPED_QUOTE_RE = re.compile(r'(?<!\\)"')
+_KEY_VALUE_RE = re.compile(r'("[\w_]+")\s*:\s*"([^"]*(?:"[^"]*)*)"')
+# Line and block comments in one alternation so comments are stripped in a single scan
+_COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+_SINGLE_QUOTED_KEY_RE = re.compile(r"'(\w+)':")
+_SINGLE_QUOTED_VALUE_RE = re.compile(r":\s*'([^']*)'")
+
 
 def parse_json_robust(text: str, max_attempts: int = 5) -> dict:
     """
@@ -26,43 +50,63 @@ def parse_json_robust(text: str, max_attempts: int = 5) -> dict:
     if not text or not isinstance(text, str):
         raise ValueError("Input must be a non-empty string")
     
+    # Fastest path: a bare object (the norm for schema-constrained responses)
+    # decodes directly, without scanning it for structure first
+    stripped = text.strip()
+    if stripped.startswith('{') and stripped.endswith('}'):
+        try:
+            return _loads(stripped)
+        except json.JSONDecodeError:
+            pass
+    
+    # Fast path: one scan for the first balanced {...} handles JSON wrapped in
+    # code fences or prose without any splitting or cleanup
+    json_object = _extract_json_object(text)
+    if json_object is not None:
+        try:
+            return _loads(json_object)
+        except json.JSONDecodeError:
+            logger.debug("   Balanced JSON object did not parse, trying repair strategies...")
+    
     # Strategy 1: Extract JSON from code blocks
     json_text = _extract_from_code_blocks(text)
     
-    # Strategy 2: Find JSON object boundaries
-    if '{' in json_text and '}' in json_text:
-        start = json_text.find('{')
+    # Strategy 2: Find JSON object boundaries (the index lookups double as the
+    # presence check, so each end of the text is scanned once)
+    start = json_text.find('{')
+    if start >= 0:
         end = json_text.rfind('}') + 1
-        json_text = json_text[start:end]
+        if end:
+            json_text = json_text[start:end]
     
     # Try multiple parsing strategies
     for attempt in range(max_attempts):
         try:
             # Strategy 1: Direct parse
             if attempt == 0:
-                return json.loads(json_text)
+                return _loads(json_text)
             
             # Strategy 2: Fix trailing commas
             elif attempt == 1:
-                cleaned = re.sub(r',(\s*[}\]])', r'\1', json_text)
-                return json.loads(cleaned)
+                cleaned = _TRAILING_COMMA_RE.sub(r'\1', json_text)
+                return _loads(cleaned)
             
             # Strategy 3: Fix unescaped quotes in strings
             elif attempt == 2:
                 cleaned = _fix_unescaped_quotes(json_text)
-                return json.loads(cleaned)
+                return _loads(cleaned)
             
             # Strategy 4: Remove comments and fix common issues
             elif attempt == 3:
                 cleaned = _remove_comments(json_text)
-                cleaned = re.sub(r',(\s*[}\]])', r'\1', cleaned)
+                cleaned = _TRAILING_COMMA_RE.sub(r'\1', cleaned)
                 cleaned = _fix_unescaped_quotes(cleaned)
-                return json.loads(cleaned)
+                return _loads(cleaned)
             
             # Strategy 5: Aggressive cleaning
             elif attempt == 4:
                 cleaned = _aggressive_clean(json_text)
-                return json.loads(cleaned)
+                return _loads(cleaned)
                 
         except json.JSONDecodeError as e:
             if attempt == max_attempts - 1:
@@ -77,24 +121,65 @@ def parse_json_robust(text: str, max_attempts: int = 5) -> dict:
     raise json.JSONDecodeError("All parsing strategies failed", json_text, 0)
 
 
+# Characters that affect brace matching: string delimiters, escapes and braces
+_JSON_STRUCTURAL_RE = re.compile(r'["\\{}]')
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced top-level JSON object in text, or None.
+    
+    Single pass from the first '{', tracking string and escape state so braces
+    inside string values are ignored. Only structural characters are visited.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped_pos = -1  # position of the character consumed by the last backslash
+    for match in _JSON_STRUCTURAL_RE.finditer(text, start):
+        pos = match.start()
+        if pos == escaped_pos:
+            continue
+        char = match.group()
+        if in_string:
+            if char == '\\':
+                escaped_pos = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    
+    return None
+
+
 def _extract_from_code_blocks(text: str) -> str:
     """Extract JSON from markdown code blocks."""
     # Try ```json first
-    if "```json" in text:
-        parts = text.split("```json")
-        if len(parts) > 1:
-            json_part = parts[1].split("```")[0].strip()
-            return json_part
-    
-    # Try ``` code blocks
-    if "```" in text:
-        parts = text.split("```")
-        if len(parts) > 1:
-            # Find the part that looks like JSON (starts with {)
-            for part in parts[1:]:
-                part = part.strip()
-                if part.startswith('{'):
-                    return part
+    start = text.find("```json")
+    if start >= 0:
+        start += len("```json")
+        end = text.find("```", start)
+        return (text[start:] if end < 0 else text[start:end]).strip()
+    
+    # Try ``` code blocks: walk the segments between fences by index
+    # instead of splitting the whole text
+    fence = text.find("```")
+    while fence >= 0:
+        start = fence + 3
+        fence = text.find("```", start)
+        # Find the part that looks like JSON (starts with {)
+        part = (text[start:] if fence < 0 else text[start:fence]).strip()
+        if part.startswith('{'):
+            return part
     
     return text.strip()
 
@@ -108,23 +193,20 @@ def _fix_unescaped_quotes(text: str) -> str:
         value = match.group(2)    # value with "quotes"
         
         # Only escape quotes that are not already escaped
-        value = re.sub(r'(?<!\\)"', r'\\"', value)
+        value = _UNESCAPED_QUOTE_RE.sub(r'\\"', value)
         return f'{key_part} "{value}"'
     
     # Match: "key": "value"
-    pattern = r'("[\w_]+")\s*:\s*"([^"]*(?:"[^"]*)*)"'
-    result = re.sub(pattern, escape_quotes_in_value, text)
+    result = _KEY_VALUE_RE.sub(escape_quotes_in_value, text)
     
     return result
 
 
 def _remove_comments(text: str) -> str:
     """Remove comments from JSON-like text."""
-    # Remove single-line comments (not standard JSON but sometimes present)
-    text = re.sub(r'//.*?$', '', text, flags=re.MULTILINE)
-    # Remove multi-line comments
-    text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
-    return text
+    # Single-line comments (not standard JSON but sometimes present) and
+    # multi-line comments; whichever starts first wins
+    return _COMMENT_RE.sub('', text)
 
 
 def _aggressive_clean(text: str) -> str:
@@ -133,12 +215,12 @@ def _aggressive_clean(text: str) -> str:
     text = ' '.join(text.split())
     
     # Fix trailing commas
-    text = re.sub(r',(\s*[}\]])', r'\1', text)
+    text = _TRAILING_COMMA_RE.sub(r'\1', text)
     
     # Fix single quotes to double quotes (but be careful with apostrophes)
     # Only replace single quotes that are clearly meant to be string delimiters
-    text = re.sub(r"'(\w+)':", r'"\1":', text)  # 'key': -> "key":
-    text = re.sub(r":\s*'([^']*)'", r': "\1"', text)  # : 'value' -> : "value"
+    text = _SINGLE_QUOTED_KEY_RE.sub(r'"\1":', text)  # 'key': -> "key":
+    text = _SINGLE_QUOTED_VALUE_RE.sub(r': "\1"', text)  # : 'value' -> : "value"
     
     # Remove comments
     text = _remove_comments(text)